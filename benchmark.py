@@ -0,0 +1,362 @@
+# Course: CS261 - Data Structures
+# Description: Benchmark suite for DirectedGraph, SparseDirectedGraph and UndirectedGraph. Times every public method
+#   on seeded generated graphs of growing size, measures peak memory, and writes the results as JSON so runs from
+#   different commits can be compared.
+#
+#   python benchmark.py --sizes 100 1000 10000 --output before.json
+#   python benchmark.py --sizes 100 1000 10000 --output after.json --compare before.json
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from d_graph import DirectedGraph, SparseDirectedGraph
+from graph_generators import GENERATORS, undirected_pairs
+from ud_graph import UndirectedGraph
+
+# A dense matrix has V^2 cells, so past this many vertices it's skipped instead of eating all the memory
+MAX_DENSE_VERTICES = 5000
+
+# weight_matrix(), floyd_warshall() and transitive_closure() build V x V NumPy arrays (and Floyd-Warshall is V^3), so
+#   they only run up to this many vertices
+MAX_MATRIX_VERTICES = 2000
+
+# How many calls the timings of the small edit methods cover
+EDIT_OPS = 1000
+
+# How many calls the timings of the point-to-point searches cover, each of those can touch the whole graph
+SEARCH_OPS = 100
+
+
+def _walks(edges: [], starts: [], length: int) -> []:
+    """
+    Follows the generated edges from every start for up to length steps, so is_valid_path() and validate_paths() have
+        real paths to check.
+    """
+    first_out = {}
+    for u, v, _ in edges:
+        first_out.setdefault(u, v)
+    paths = []
+    for start in starts:
+        path = [start]
+        while len(path) <= length and path[-1] in first_out:
+            path.append(first_out[path[-1]])
+        paths.append(path)
+    return paths
+
+
+def _saver(graph_factory, scratch: str):
+    """
+    Returns a setup() that saves a freshly built graph to a new file in scratch and hands back its path. Every call
+        gets its own file, since a graph loaded with mmap=True may still have the last one mapped.
+    """
+    counter = itertools.count()
+
+    def setup():
+        path = os.path.join(scratch, f'load-{next(counter)}.bin')
+        graph_factory().save(path)
+        return path
+    return setup
+
+
+def directed_tasks(cls, edges: [], n: int, rng, scratch: str) -> []:
+    """
+    Returns (method name, setup, run) triples for one directed graph class, covering every public method. setup()
+        builds whatever run() needs, and only run() gets timed. scratch is a directory save() and load() can use.
+    """
+    def built(graph_edges=edges):
+        graph = cls()
+        graph.add_edges_from(graph_edges)
+        while graph.v_count < n:
+            graph.add_vertex()
+        return graph
+
+    # The topological order and DAG path methods only do their real work on an acyclic graph
+    dag_edges = [(u, v, w) for u, v, w in edges if u < v]
+
+    def built_with(method):
+        def setup():
+            graph = built()
+            method(graph)
+            return graph
+        return setup
+
+    pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(EDIT_OPS)]
+    sources = [rng.randrange(n) for _ in range(8)]
+    path = _walks(edges, [0], 50)[0]
+    paths = _walks(edges, [rng.randrange(n) for _ in range(EDIT_OPS)], 20)
+    columns = [list(column) for column in zip(*edges)] or [[], [], []]
+    if np is not None:
+        columns = [np.array(column) for column in columns]
+    save_path = os.path.join(scratch, 'save.bin')
+
+    def edit(method, count=EDIT_OPS):
+        def run(graph):
+            for u, v in pairs[:count]:
+                method(graph, u, v)
+        return run
+
+    def removed():
+        graph = built()
+        for u, _ in pairs[:n // 10]:
+            graph.remove_vertex(u)
+        return graph
+
+    tasks = [
+        ('__init__', lambda: None, lambda _: cls(edges)),
+        ('add_edges_from', lambda: None, lambda _: built()),
+        ('get_vertices', built, lambda g: g.get_vertices()),
+        ('get_edges', built, lambda g: g.get_edges()),
+        ('is_valid_path', built, lambda g: g.is_valid_path(path)),
+        ('dfs', built, lambda g: g.dfs(0)),
+        ('bfs', built, lambda g: g.bfs(0)),
+        ('has_cycle', built, lambda g: g.has_cycle()),
+        ('dijkstra', built, lambda g: g.dijkstra(0)),
+        ('shortest_path', built, lambda g: g.shortest_path(0, n - 1)),
+        ('add_vertex', built, lambda g: [g.add_vertex() for _ in range(EDIT_OPS)]),
+        ('add_edge', built, edit(lambda g, u, v: g.add_edge(u, v, 3))),
+        ('remove_edge', built, edit(lambda g, u, v: g.remove_edge(u, v))),
+        ('try_add_edge', built, edit(lambda g, u, v: g.try_add_edge(u, v, 3))),
+        ('add_edge_arrays', cls, lambda g: g.add_edge_arrays(*columns)),
+        ('from_edge_array', lambda: None, lambda _: cls.from_edge_array(*columns)),
+        ('reserve', cls, lambda g: g.reserve(n)),
+        ('remove_vertex', built, edit(lambda g, u, v: g.remove_vertex(u))),
+        ('compact', removed, lambda g: g.compact()),
+        ('snapshot', built, lambda g: g.snapshot()),
+        ('vertices', built, lambda g: sum(1 for _ in g.vertices())),
+        ('edges', built, lambda g: sum(1 for _ in g.edges())),
+        ('neighbors', built, lambda g: [list(g.neighbors(v).items()) for v in range(n)]),
+        ('validate_paths', built, lambda g: g.validate_paths(paths)),
+        ('iter_dfs', built, lambda g: list(g.iter_dfs(0))),
+        ('iter_bfs', built, lambda g: list(g.iter_bfs(0))),
+        ('shortest_paths', built, lambda g: g.shortest_paths(0)),
+        ('enable_path_cache', built, lambda g: g.enable_path_cache()),
+        ('dijkstra (cached)', built_with(lambda g: (g.enable_path_cache(), g.dijkstra(0))), lambda g: g.dijkstra(0)),
+        ('disable_path_cache', built_with(lambda g: g.enable_path_cache()), lambda g: g.disable_path_cache()),
+        ('multi_source_dijkstra', built, lambda g: list(g.multi_source_dijkstra(sources))),
+        ('all_pairs_shortest_paths', built, lambda g: sum(1 for _ in g.all_pairs_shortest_paths())),
+        ('prepare_landmarks', built, lambda g: g.prepare_landmarks()),
+        ('astar', built_with(lambda g: g.prepare_landmarks()),
+         edit(lambda g, u, v: g.astar(u, v), SEARCH_OPS)),
+        ('strongly_connected_components', built, lambda g: g.strongly_connected_components()),
+        ('condensation', built, lambda g: g.condensation()),
+        ('can_reach', built_with(lambda g: g.condensation()), edit(lambda g, u, v: g.can_reach(u, v))),
+        ('track_cycles', built, lambda g: g.track_cycles()),
+        ('add_edge (tracked)', built_with(lambda g: g.track_cycles()), edit(lambda g, u, v: g.add_edge(u, v, 3))),
+        ('untrack_cycles', built_with(lambda g: g.track_cycles()), lambda g: g.untrack_cycles()),
+        ('topological_order', lambda: built(dag_edges), lambda g: g.topological_order(levels=True)),
+        ('dag_shortest_paths', lambda: built(dag_edges), lambda g: g.dag_shortest_paths(0)),
+        ('dag_longest_paths', lambda: built(dag_edges), lambda g: g.dag_longest_paths(0)),
+        ('instrument', built, lambda g: g.instrument()),
+        ('uninstrument', built_with(lambda g: g.instrument()), lambda g: g.uninstrument()),
+        ('save', built, lambda g: g.save(save_path)),
+        ('load', _saver(built, scratch), lambda p: cls.load(p)),
+        ('load (mmap=False)', _saver(built, scratch), lambda p: cls.load(p, mmap=False)),
+    ]
+
+    if np is not None and n <= MAX_MATRIX_VERTICES:
+        def hops():
+            return built().floyd_warshall()[1]
+
+        tasks += [
+            ('weight_matrix', built, lambda g: g.weight_matrix()),
+            ('floyd_warshall', built, lambda g: g.floyd_warshall()),
+            ('next_hop_path', hops, edit(lambda hop, u, v: cls.next_hop_path(hop, u, v))),
+            ('transitive_closure', built, lambda g: g.transitive_closure()),
+        ]
+    return tasks
+
+
+def undirected_tasks(edges: [], n: int, rng, scratch: str) -> []:
+    """
+    Same as directed_tasks(), for UndirectedGraph.
+    """
+    pairs = undirected_pairs(edges)
+
+    def built():
+        graph = UndirectedGraph()
+        graph.add_edges_from(pairs)
+        return graph
+
+    names = [(f'v{rng.randrange(n)}', f'v{rng.randrange(n)}') for _ in range(EDIT_OPS)]
+    path = [f'v{v}' for v in _walks(edges, [0], 50)[0]]
+    paths = [[f'v{v}' for v in walk] for walk in _walks(edges, [rng.randrange(n) for _ in range(EDIT_OPS)], 20)]
+    columns = [list(column) for column in zip(*pairs)] or [[], []]
+    save_path = os.path.join(scratch, 'save.bin')
+
+    def edit(method, count=EDIT_OPS):
+        def run(graph):
+            for u, v in names[:count]:
+                method(graph, u, v)
+        return run
+
+    def instrumented():
+        graph = built()
+        graph.instrument()
+        return graph
+
+    return [
+        ('__init__', lambda: None, lambda _: UndirectedGraph(pairs)),
+        ('add_edges_from', lambda: None, lambda _: built()),
+        ('get_vertices', built, lambda g: g.get_vertices()),
+        ('get_edges', built, lambda g: g.get_edges()),
+        ('is_valid_path', built, lambda g: g.is_valid_path(path)),
+        ('dfs', built, lambda g: g.dfs('v0')),
+        ('bfs', built, lambda g: g.bfs('v0')),
+        ('count_connected_components', built, lambda g: g.count_connected_components()),
+        ('has_cycle', built, lambda g: g.has_cycle()),
+        ('add_vertex', built, lambda g: [g.add_vertex(f'new{i}') for i in range(EDIT_OPS)]),
+        ('add_edge', built, edit(lambda g, u, v: g.add_edge(u, v))),
+        ('remove_edge', built, edit(lambda g, u, v: g.remove_edge(u, v))),
+        ('remove_vertex', built, edit(lambda g, u, v: g.remove_vertex(u))),
+        ('from_edge_array', lambda: None, lambda _: UndirectedGraph.from_edge_array(*columns)),
+        ('component_of', built, edit(lambda g, u, v: g.component_of(u))),
+        ('same_component', built, edit(lambda g, u, v: g.same_component(u, v))),
+        ('shortest_path', built, edit(lambda g, u, v: g.shortest_path(u, v), SEARCH_OPS)),
+        ('distance', built, edit(lambda g, u, v: g.distance(u, v), SEARCH_OPS)),
+        ('snapshot', built, lambda g: g.snapshot()),
+        ('vertices', built, lambda g: sum(1 for _ in g.vertices())),
+        ('edges', built, lambda g: sum(1 for _ in g.edges())),
+        ('neighbors', built, lambda g: [list(g.neighbors(v)) for v in g.vertices()]),
+        ('validate_paths', built, lambda g: g.validate_paths(paths)),
+        ('instrument', built, lambda g: g.instrument()),
+        ('uninstrument', instrumented, lambda g: g.uninstrument()),
+        ('save', built, lambda g: g.save(save_path)),
+        ('load', _saver(built, scratch), lambda p: UndirectedGraph.load(p)),
+        ('load (mmap=False)', _saver(built, scratch), lambda p: UndirectedGraph.load(p, mmap=False)),
+    ]
+
+
+def measure(setup, run, memory: bool) -> dict:
+    """
+    Times one run() call on a fresh setup(), and optionally a second one under tracemalloc for the peak memory.
+    """
+    graph = setup()
+    start = time.perf_counter()
+    run(graph)
+    result = {'seconds': time.perf_counter() - start}
+
+    # tracemalloc slows everything down, so the memory run is separate from the timed one
+    if memory:
+        graph = setup()
+        tracemalloc.start()
+        run(graph)
+        result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def run_suite(sizes: [], generators: [], graphs: [], seed: int = 0, memory: bool = True, time_limit: float = 30,
+              log=None) -> []:
+    """
+    Runs every method of every graph class on every generator and size. A method whose timing, scaled up
+        quadratically to the next size, would take longer than time_limit seconds is skipped for the bigger sizes of
+        that generator, so slow methods don't hang the run.
+    """
+    records = []
+    sizes = sorted(sizes)
+    with tempfile.TemporaryDirectory() as scratch:
+        for name in generators:
+            too_slow = set()
+            for i, n in enumerate(sizes):
+                growth = (sizes[i + 1] / n) ** 2 if i + 1 < len(sizes) else 1
+                edges = GENERATORS[name](n, seed=seed)
+                for graph_name in graphs:
+                    if graph_name == 'DirectedGraph' and n > MAX_DENSE_VERTICES:
+                        continue
+                    rng = random.Random(seed)
+                    if graph_name == 'UndirectedGraph':
+                        tasks = undirected_tasks(edges, n, rng, scratch)
+                    else:
+                        tasks = directed_tasks(globals()[graph_name], edges, n, rng, scratch)
+
+                    for method, setup, run in tasks:
+                        record = {'generator': name, 'vertices': n, 'edges': len(edges), 'graph': graph_name,
+                                  'method': method}
+                        if (graph_name, method) in too_slow:
+                            record['skipped'] = 'too slow at a smaller size'
+                        else:
+                            record.update(measure(setup, run, memory))
+                            if record['seconds'] * growth > time_limit:
+                                too_slow.add((graph_name, method))
+                        records.append(record)
+                        if log is not None:
+                            log(record)
+    return records
+
+
+def compare(old: [], new: []) -> []:
+    """
+    Matches up two result lists and returns (key, old seconds, new seconds, speedup) rows.
+    """
+    def key(record):
+        return record['generator'], record['vertices'], record['graph'], record['method']
+
+    before = {key(record): record for record in old if 'seconds' in record}
+    rows = []
+    for record in new:
+        if 'seconds' in record and key(record) in before:
+            old_seconds = before[key(record)]['seconds']
+            rows.append((key(record), old_seconds, record['seconds'], old_seconds / max(record['seconds'], 1e-9)))
+    return rows
+
+
+def _metadata() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'python': sys.version, 'platform': platform.platform(), 'commit': commit or None,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Benchmarks the graph classes on generated graphs.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--generators', nargs='+', default=sorted(GENERATORS), choices=sorted(GENERATORS))
+    parser.add_argument('--graphs', nargs='+', default=['DirectedGraph', 'SparseDirectedGraph', 'UndirectedGraph'],
+                        choices=['DirectedGraph', 'SparseDirectedGraph', 'UndirectedGraph'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--time-limit', type=float, default=30)
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc peak memory runs')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--compare', help='earlier JSON results to print speedups against')
+    args = parser.parse_args(argv)
+
+    def log(record):
+        timing = record.get('skipped') or f"{record['seconds']:.4f}s"
+        print(f"{record['generator']:>24} {record['vertices']:>8} {record['graph']:>20} {record['method']:>27} "
+              f"{timing}", file=sys.stderr)
+
+    records = run_suite(args.sizes, args.generators, args.graphs, args.seed, not args.no_memory, args.time_limit,
+                        log)
+    output = json.dumps({'meta': _metadata(), 'results': records}, indent=1)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as file:
+            old = json.load(file)['results']
+        for key, old_seconds, new_seconds, speedup in compare(old, records):
+            print(' '.join(map(str, key)), f'{old_seconds:.4f}s -> {new_seconds:.4f}s ({speedup:.2f}x)',
+                  file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
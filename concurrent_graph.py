@@ -0,0 +1,349 @@
+# Course: CS261 - Data Structures
+# Description: Thread-safe front for DirectedGraph and UndirectedGraph. Queries share a fair reader/writer lock and can
+#   be fanned out over a thread pool, writes get queued and applied in batches under a single exclusive lock. Running
+#   this file runs a stress test of it.
+
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class RWLock:
+    """
+    Fair reader/writer lock. Requests are served in the order they arrive, and a run of readers next to each other in
+    the queue share the lock, so a stream of readers can't starve a writer and the other way around.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._queue = deque()
+        self._readers = 0
+        self._writer = False
+
+    def acquire_read(self) -> None:
+        with self._cond:
+            # Someone already waiting means we get in line behind them, even if readers hold the lock right now
+            if not self._writer and not self._queue:
+                self._readers += 1
+                return
+            self._wait(False)
+
+    def release_read(self) -> None:
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._grant()
+
+    def acquire_write(self) -> None:
+        with self._cond:
+            if not self._writer and self._readers == 0 and not self._queue:
+                self._writer = True
+                return
+            self._wait(True)
+
+    def release_write(self) -> None:
+        with self._cond:
+            self._writer = False
+            self._grant()
+
+    @contextmanager
+    def read_locked(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    def _wait(self, writer: bool) -> None:
+        # A ticket is [wants to write, has been granted the lock]
+        ticket = [writer, False]
+        self._queue.append(ticket)
+        while not ticket[1]:
+            self._cond.wait()
+
+    def _grant(self) -> None:
+        """
+        Hands the free lock to the front of the queue: one writer, or every reader up to the next writer.
+        """
+        queue = self._queue
+        if queue and queue[0][0]:
+            queue.popleft()[1] = True
+            self._writer = True
+        else:
+            while queue and not queue[0][0]:
+                queue.popleft()[1] = True
+                self._readers += 1
+        self._cond.notify_all()
+
+
+class ConcurrentGraph:
+    """
+    Wraps a DirectedGraph or UndirectedGraph so any number of threads can use it.
+    - read(method, *args) calls a query method. Pure queries share the lock, anything that fills in a cache or index
+      inside the graph while it answers gets the lock to itself.
+    - write(method, *args) and write_many(calls) queue edits, which get applied in batches under one exclusive lock.
+      A write_many() group is never split between batches, so readers see all of it or none of it.
+    - reads apply any queued writes first, so a thread always sees its own writes
+    - submit() and map() fan reads out over a thread pool
+    """
+
+    # Queries that only look at the graph, as long as it has no path cache and isn't instrumented
+    shared_reads = frozenset(('dfs', 'bfs', 'is_valid_path', 'get_vertices', 'get_edges', 'dijkstra', 'shortest_paths',
+                              'shortest_path', 'distance'))
+
+    def __init__(self, graph, workers: int = None, batch_size: int = 256):
+        self.graph = graph
+        self.lock = RWLock()
+        self.batch_size = batch_size
+        self._pending = []
+        self._pending_count = 0
+        self._pending_lock = threading.Lock()
+        self._workers = workers
+        self._executor = None
+
+    def read(self, method: str, *args, **kwargs):
+        """
+        Calls graph.method(*args, **kwargs) under the lock and returns what it returns.
+        """
+        if self._pending:
+            self.flush()
+
+        graph = self.graph
+        shared = (method in self.shared_reads and getattr(graph, 'path_cache', None) is None
+                  and getattr(graph, 'metrics', None) is None)
+        with (self.lock.read_locked() if shared else self.lock.write_locked()):
+            return getattr(graph, method)(*args, **kwargs)
+
+    def write(self, method: str, *args, **kwargs) -> None:
+        """
+        Queues graph.method(*args, **kwargs).
+        """
+        self.write_many([(method, args, kwargs)])
+
+    def write_many(self, calls) -> None:
+        """
+        Queues a group of (method, args) or (method, args, kwargs) calls that get applied together.
+        """
+        group = [(call[0], call[1], call[2] if len(call) > 2 else {}) for call in calls]
+        with self._pending_lock:
+            self._pending.append(group)
+            self._pending_count += len(group)
+            full = self._pending_count >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Applies every queued write in one batch and returns how many there were. If some of them raise, the rest still
+            get applied and the first error is raised at the end.
+        """
+        # The queue is taken while holding the write lock, so batches get applied in the order they were queued
+        with self.lock.write_locked():
+            with self._pending_lock:
+                pending, self._pending = self._pending, []
+                self._pending_count = 0
+
+            error = None
+            count = 0
+            for group in pending:
+                for method, args, kwargs in group:
+                    count += 1
+                    try:
+                        getattr(self.graph, method)(*args, **kwargs)
+                    except Exception as e:
+                        if error is None:
+                            error = e
+        if error is not None:
+            raise error
+        return count
+
+    def snapshot(self):
+        """
+        Returns graph.snapshot() with all queued writes applied, for analytics that shouldn't hold the lock.
+        """
+        self.flush()
+        with self.lock.write_locked():
+            return self.graph.snapshot()
+
+    def submit(self, method: str, *args, **kwargs):
+        """
+        Runs read(method, *args, **kwargs) on the thread pool and returns its Future.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self._workers)
+        return self._executor.submit(self.read, method, *args, **kwargs)
+
+    def map(self, calls) -> []:
+        """
+        Runs a list of (method, args) or (method, args, kwargs) reads on the thread pool, and returns their results in
+            the same order.
+        """
+        futures = [self.submit(call[0], *call[1], **(call[2] if len(call) > 2 else {})) for call in calls]
+        return [future.result() for future in futures]
+
+    def close(self) -> None:
+        self.flush()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _stress_undirected(seconds: float, ring_size: int = 12) -> ():
+    """
+    Writers keep adding and removing whole rings of ring_size vertices in write_many() groups, while readers run bfs()
+        and distance() on them. Any ring that's seen at all has to be seen complete. Returns (reads, torn reads,
+        errors).
+    """
+    from ud_graph import UndirectedGraph
+
+    graph = ConcurrentGraph(UndirectedGraph(), batch_size=4 * ring_size)
+    stop = threading.Event()
+    counts = {'reads': 0, 'torn': 0, 'errors': 0}
+    counts_lock = threading.Lock()
+
+    # Newest ring each writer has queued, readers look at the ones around it since those are the ones changing
+    newest = [0, 1]
+
+    def ring(r):
+        return [f'r{r}_{j}' for j in range(ring_size)]
+
+    def writer(first):
+        r = first
+        while not stop.is_set():
+            names = ring(r)
+            graph.write_many(('add_edge', (names[j], names[(j + 1) % ring_size])) for j in range(ring_size))
+            newest[first] = r
+            if r - first >= 8:
+                graph.write_many(('remove_vertex', (name,)) for name in ring(r - 8))
+            r += 2
+
+    def reader(seed):
+        r = seed
+        reads = torn = errors = 0
+        while not stop.is_set():
+            names = ring(max(0, max(newest) - r % 12))
+            try:
+                visited = graph.read('bfs', names[0])
+                if visited and sorted(visited) != sorted(names):
+                    torn += 1
+                if graph.read('distance', names[0], names[ring_size // 2]) not in (ring_size // 2, float('inf')):
+                    torn += 1
+                reads += 2
+            except Exception:
+                errors += 1
+            r += 1
+        with counts_lock:
+            counts['reads'] += reads
+            counts['torn'] += torn
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=writer, args=(first,)) for first in (0, 1)]
+    threads += [threading.Thread(target=reader, args=(seed,)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    graph.close()
+    return counts['reads'], counts['torn'], counts['errors']
+
+
+def _stress_directed(seconds: float, length: int = 50) -> ():
+    """
+    Writers keep rewriting every weight on a chain to one new value in a single group, while readers run dijkstra()
+        along it. The distance to the end always has to be that value times the number of edges. Returns (reads, torn
+        reads, errors).
+    """
+    from d_graph import SparseDirectedGraph
+
+    graph = ConcurrentGraph(SparseDirectedGraph([(v, v + 1, 1) for v in range(length - 1)]))
+    stop = threading.Event()
+    counts = {'reads': 0, 'torn': 0, 'errors': 0}
+    counts_lock = threading.Lock()
+
+    def writer(seed):
+        weight = seed
+        while not stop.is_set():
+            weight = weight % 50 + 1
+            graph.write_many(('add_edge', (v, v + 1, weight)) for v in range(length - 1))
+
+    def reader():
+        reads = torn = errors = 0
+        while not stop.is_set():
+            try:
+                distance = graph.read('dijkstra', 0)[-1]
+                if distance % (length - 1) != 0:
+                    torn += 1
+                if not graph.read('is_valid_path', list(range(length))):
+                    torn += 1
+                reads += 2
+            except Exception:
+                errors += 1
+        with counts_lock:
+            counts['reads'] += reads
+            counts['torn'] += torn
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=writer, args=(seed,)) for seed in (1, 2)]
+    threads += [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    graph.close()
+    return counts['reads'], counts['torn'], counts['errors']
+
+
+def _throughput(workers: int, queries: int = 400) -> float:
+    """
+    Queries per second for a batch of independent bfs() reads fanned out over a pool of the given size.
+    """
+    from d_graph import SparseDirectedGraph
+    from graph_generators import erdos_renyi
+
+    with ConcurrentGraph(SparseDirectedGraph(erdos_renyi(3000, seed=1)), workers=workers) as graph:
+        calls = [('bfs', (v % 3000,)) for v in range(queries)]
+        graph.map(calls[:workers])
+        start = time.perf_counter()
+        graph.map(calls)
+        return queries / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+
+    print("\nStress test - UndirectedGraph rings added/removed while being searched")
+    print("-----------------------------------------------------------------------")
+    reads, torn, errors = _stress_undirected(2)
+    print(f'{reads} reads, {torn} torn, {errors} errors')
+
+    print("\nStress test - DirectedGraph chain reweighted while dijkstra runs on it")
+    print("----------------------------------------------------------------------")
+    reads, torn, errors = _stress_directed(2)
+    print(f'{reads} reads, {torn} torn, {errors} errors')
+
+    print("\nRead throughput by thread pool size")
+    print("-----------------------------------")
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('GIL enabled, expect flat numbers' if gil else 'free-threaded build')
+    for workers in (1, 2, 4, 8):
+        print(f'{workers} workers: {_throughput(workers):.0f} queries/s')
@@ -5,6 +5,1201 @@
 #    search through the graph in different ways, including finding the shortest path to a node using dijkstra algorithm.
 
 
+import mmap as mmap_module
+import os
+import struct
+import sys
+from array import array
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from copy import copy
+from heapq import heappop, heappush
+from operator import index
+
+from graph_metrics import GraphMetrics, instrument, uninstrument
+from graph_views import SetView
+from path_validation import check_paths, check_paths_python, csr_index, split_paths
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _weight_array(weights=()) -> array:
+    """
+    Returns a compact array for edge weights. Integer weights stay integers, anything else falls back to doubles.
+    """
+    weights = list(weights)
+    try:
+        return array('q', weights)
+    except TypeError:
+        return array('d', weights)
+
+
+def _typecode(data) -> str:
+    """
+    Returns the element type of an array, or of a memoryview standing in for one (like the ones load() maps).
+    """
+    return data.typecode if isinstance(data, array) else data.format
+
+
+def _as_list(values) -> []:
+    """
+    Turns a NumPy array (or any other sequence) into a list of plain Python values.
+    """
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def _csr_dijkstra(offsets, targets, weights, src: int) -> array:
+    """
+    Heap-based dijkstra straight on CSR arrays (or memoryviews of them). Returns the distances as an array of doubles.
+    """
+    distances = array('d', [float('inf')]) * (len(offsets) - 1)
+    settled = bytearray(len(offsets) - 1)
+    distances[src] = 0
+    heap = [(0, src)]
+    while heap:
+        distance, vertex = heappop(heap)
+        if settled[vertex]:
+            continue
+        settled[vertex] = 1
+        for index in range(offsets[vertex], offsets[vertex + 1]):
+            dst = targets[index]
+            new_distance = distance + weights[index]
+            if new_distance < distances[dst]:
+                distances[dst] = new_distance
+                heappush(heap, (new_distance, dst))
+    return distances
+
+
+def _dijkstra_distances(neighbors, n: int, src: int) -> array:
+    """
+    Heap-based dijkstra over a neighbors(v) function giving (vertex, weight) pairs, so the same code runs forwards on
+        out-edges and backwards on in-edges. Returns the distances as an array of doubles.
+    """
+    distances = array('d', [float('inf')]) * n
+    settled = bytearray(n)
+    distances[src] = 0
+    heap = [(0, src)]
+    while heap:
+        distance, vertex = heappop(heap)
+        if settled[vertex]:
+            continue
+        settled[vertex] = 1
+        for dst, weight in neighbors(vertex):
+            new_distance = distance + weight
+            if new_distance < distances[dst]:
+                distances[dst] = new_distance
+                heappush(heap, (new_distance, dst))
+    return distances
+
+
+# CSR arrays a pool worker attached to (set up once per worker by _attach_csr)
+_worker_csr = None
+
+
+def _attach_csr(blocks) -> None:
+    """
+    Pool initializer. Maps the shared memory blocks holding the CSR arrays, without copying them.
+    """
+    global _worker_csr
+    views = []
+    for name, typecode, length in blocks:
+        block = SharedMemory(name=name)
+
+        # Blocks can be bigger than the data (an empty array still gets one byte), so the bytes get cut down first
+        itemsize = array(typecode).itemsize
+        views.append((block, block.buf[:length * itemsize].cast(typecode)))
+    _worker_csr = views
+
+
+def _worker_dijkstra(src: int) -> ():
+    offsets, targets, weights = (view for _, view in _worker_csr)
+    return src, _csr_dijkstra(offsets, targets, weights, src)
+
+
+# Binary file layout used by save()/load(), everything little-endian:
+#   header: magic, format version, vertex count, edge count, weight typecode ('q' or 'd'), a flag for removed
+#   vertices, padded to 32 bytes
+#   then int64 offsets[V + 1], int64 targets[E] and the weights[E] (int64 or float64)
+#   then, only if the flag is set, one byte per vertex (1 = removed), padded to a multiple of 8
+# Version 1 files are the same without the flag and the tombstones, and still load.
+FILE_MAGIC = b'DGRF'
+FILE_VERSION = 2
+_HEADER = struct.Struct('<4sIqqc?6x')
+
+
+def _little_endian(data) -> bytes:
+    if sys.byteorder == 'little':
+        return data.tobytes()
+    data = array(_typecode(data), data)
+    data.byteswap()
+    return data.tobytes()
+
+
+class DenseStorage:
+    """
+    Adjacency matrix storage. A weight of 0 means there is no edge. Best for small graphs.
+    - rows has room for 'capacity' vertices and each row is a preallocated list of 'capacity' cells
+    - only the first vertex_count rows/columns are in use, the rest is zeroed space for future vertices
+    - capacity doubles when it runs out, so adding a vertex doesn't have to touch every row
+    - snapshot() shares the rows with a read-only copy, after which rows get copied the first time they are written
+    """
+
+    # Set on the storage of a snapshot, which refuses all writes
+    read_only = False
+
+    def __init__(self):
+        self.rows = []
+        self.capacity = 0
+        self.size = 0
+        self.edge_count = 0
+        self.degrees = []
+
+        # shared: a snapshot uses our rows list. owned: rows copied since the last snapshot (None if nothing is shared).
+        self.shared = False
+        self.owned = None
+
+    def snapshot(self):
+        """
+        Returns a read-only storage sharing everything with this one, in O(1).
+        """
+        frozen = copy(self)
+        frozen.read_only = True
+        self.shared = True
+        return frozen
+
+    def _before_write(self, src: int = None) -> None:
+        """
+        Makes row src (and the list of rows) safe to write to, copying them if a snapshot still uses them.
+        """
+        if self.read_only:
+            raise TypeError('graph snapshots are read-only')
+        if self.shared:
+            self.rows = list(self.rows)
+            self.degrees = list(self.degrees)
+            self.owned = set()
+            self.shared = False
+        if src is not None and self.owned is not None and src not in self.owned:
+            self.rows[src] = list(self.rows[src])
+            self.owned.add(src)
+
+    @property
+    def vertex_count(self) -> int:
+        return self.size
+
+    def reserve(self, capacity: int) -> None:
+        """
+        Makes room for at least 'capacity' vertices.
+        """
+        if capacity <= self.capacity:
+            return
+        self._before_write()
+        extra = capacity - self.capacity
+        if self.owned is None:
+            for row in self.rows:
+                row.extend([0] * extra)
+        else:
+            # Rows a snapshot might still be using get grown into new lists instead
+            self.rows = [row + [0] * extra for row in self.rows]
+            self.owned = None
+        self.rows.extend([0] * capacity for _ in range(extra))
+        self.capacity = capacity
+
+    def add_vertex(self) -> None:
+        # The new row and column are already zeroed, we only grow when the spare space runs out
+        self._before_write()
+        if self.size == self.capacity:
+            self.reserve(max(4, self.capacity * 2))
+        self.size += 1
+        self.degrees.append(0)
+
+    def get(self, src: int, dst: int):
+        return self.rows[src][dst]
+
+    def set(self, src: int, dst: int, weight) -> None:
+        self._before_write(src)
+        old = self.rows[src][dst]
+        self.rows[src][dst] = weight
+        self.edge_count += (weight != 0) - (old != 0)
+        self.degrees[src] += (weight != 0) - (old != 0)
+
+    def degree(self, src: int) -> int:
+        return self.degrees[src]
+
+    def neighbors(self, src: int) -> []:
+        """
+        Returns (destination, weight) pairs for the out-edges of src in ascending destination order.
+        """
+        # Cells past the last vertex are always 0, so there is no need to cut the row down first
+        return [(dst, weight) for dst, weight in enumerate(self.rows[src]) if weight != 0]
+
+    def in_neighbors(self, dst: int) -> []:
+        """
+        Returns (source, weight) pairs for the in-edges of dst in ascending source order. This is a column scan.
+        """
+        rows = self.rows
+        return [(src, rows[src][dst]) for src in range(self.size) if rows[src][dst] != 0]
+
+    def row(self, src: int) -> []:
+        return self.rows[src][:self.size]
+
+    def edges(self):
+        for src in range(self.size):
+            for dst, weight in enumerate(self.rows[src]):
+                if weight != 0:
+                    yield src, dst, weight
+
+    def bulk_set(self, src, dst, weights) -> None:
+        """
+        Sets many (already validated) edges at once. Later duplicates win, like repeated set() calls.
+        """
+        for s, d, weight in zip(src, dst, weights):
+            self.set(s, d, weight)
+
+    def to_csr(self) -> ():
+        """
+        Returns the graph as (offsets, targets, weights) CSR arrays.
+        """
+        offsets = array('q', [0])
+        targets = array('q')
+        weights = []
+        for src in range(self.size):
+            for dst, weight in self.neighbors(src):
+                targets.append(dst)
+                weights.append(weight)
+            offsets.append(len(targets))
+        return offsets, targets, _weight_array(weights)
+
+
+class SparseStorage:
+    """
+    Compressed sparse row (CSR) storage with a small mutable delta layer on top.
+    - offsets[v]:offsets[v + 1] is the slice of targets/weights holding the out-edges of v, sorted by target
+    - delta maps src -> {dst: weight} for recent add_edge/remove_edge calls, a weight of 0 hides a CSR edge
+    - the delta layer gets merged back into the CSR arrays once it grows past a fraction of the edge count
+    - in-edges are only needed by a few algorithms, so the reverse CSR is built the first time someone asks for it
+    - snapshot() shares everything with a read-only copy. The CSR arrays are never written in place, and delta rows
+      get copied the first time they are written after that.
+    """
+
+    # Set on the storage of a snapshot, which refuses all writes
+    read_only = False
+
+    def __init__(self):
+        self.offsets = array('q', [0])
+        self.targets = array('q')
+        self.weights = _weight_array()
+        self.delta = {}
+        self.delta_size = 0
+        self.edge_count = 0
+        self.reverse = None
+        self.reverse_delta = {}
+
+        # How far the delta layer moves each row's edge count away from its CSR slice
+        self.degree_delta = {}
+
+        # shared: a snapshot uses our delta and offsets. owned: delta rows copied since the last snapshot (None if
+        #   nothing is shared). shared_offsets: offsets still have to be copied before add_vertex() appends to them.
+        self.shared = False
+        self.owned = None
+        self.shared_offsets = False
+
+    def snapshot(self):
+        """
+        Returns a read-only storage sharing everything with this one, in O(1).
+        """
+        frozen = copy(self)
+        frozen.read_only = True
+        self.shared = True
+        return frozen
+
+    def _before_write(self, src: int = None) -> None:
+        """
+        Makes the delta row of src safe to write to, copying it if a snapshot still uses it.
+        """
+        if self.read_only:
+            raise TypeError('graph snapshots are read-only')
+        if self.shared:
+            # The reverse CSR gets written in place, so we just drop ours and build a new one if it's needed again
+            self.delta = dict(self.delta)
+            self.degree_delta = dict(self.degree_delta)
+            self.owned = set()
+            self.shared_offsets = True
+            self.reverse = None
+            self.reverse_delta = {}
+            self.shared = False
+        if src is not None and self.owned is not None and src not in self.owned:
+            if src in self.delta:
+                self.delta[src] = dict(self.delta[src])
+            self.owned.add(src)
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.offsets) - 1
+
+    def reserve(self, capacity: int) -> None:
+        """
+        Nothing to do here, a new CSR row is already a single (amortized O(1)) append to 'offsets'.
+        """
+
+    @classmethod
+    def from_csr(cls, offsets, targets, weights):
+        """
+        Wraps existing CSR arrays (or read-only memoryviews of them) without copying. Changes go to the delta layer, so
+            the arrays themselves are never written to.
+        """
+        storage = cls()
+        storage.offsets, storage.targets, storage.weights = offsets, targets, weights
+        storage.edge_count = len(targets)
+        return storage
+
+    def add_vertex(self) -> None:
+        # A new vertex is just an empty CSR row. Mapped offsets are read-only and shared ones belong to a snapshot too,
+        #   so they get copied the first time.
+        self._before_write()
+        if not isinstance(self.offsets, array) or self.shared_offsets:
+            self.offsets = array('q', self.offsets)
+            self.shared_offsets = False
+        self.offsets.append(self.offsets[-1])
+        if self.reverse is not None:
+            self.reverse[0].append(self.reverse[0][-1])
+
+    def get(self, src: int, dst: int):
+        row_delta = self.delta.get(src)
+        if row_delta is not None and dst in row_delta:
+            return row_delta[dst]
+
+        # CSR rows are sorted, so a binary search finds the edge
+        lo, hi = self.offsets[src], self.offsets[src + 1]
+        index = bisect_left(self.targets, dst, lo, hi)
+        if index < hi and self.targets[index] == dst:
+            return self.weights[index]
+        return 0
+
+    def set(self, src: int, dst: int, weight) -> None:
+        old = self.get(src, dst)
+        if old == weight:
+            return
+
+        self._before_write(src)
+        row_delta = self.delta.setdefault(src, {})
+        if dst not in row_delta:
+            self.delta_size += 1
+        row_delta[dst] = weight
+        self.edge_count += (weight != 0) - (old != 0)
+        self.degree_delta[src] = self.degree_delta.get(src, 0) + (weight != 0) - (old != 0)
+        if self.reverse is not None:
+            self.reverse_delta.setdefault(dst, {})[src] = weight
+
+        if self.delta_size > max(1024, len(self.targets) // 8):
+            self.compact()
+
+    def degree(self, src: int) -> int:
+        return self.offsets[src + 1] - self.offsets[src] + self.degree_delta.get(src, 0)
+
+    def neighbors(self, src: int):
+        """
+        Returns (destination, weight) pairs for the out-edges of src in ascending destination order.
+        """
+        lo, hi = self.offsets[src], self.offsets[src + 1]
+        row_delta = self.delta.get(src)
+        if not row_delta:
+            return zip(self.targets[lo:hi], self.weights[lo:hi])
+
+        # Recently changed rows get merged with their delta on the fly
+        merged = dict(zip(self.targets[lo:hi], self.weights[lo:hi]))
+        merged.update(row_delta)
+        return sorted((dst, weight) for dst, weight in merged.items() if weight != 0)
+
+    def in_neighbors(self, dst: int):
+        """
+        Returns (source, weight) pairs for the in-edges of dst in ascending source order.
+        """
+        if self.reverse is None:
+            self._build_reverse()
+        offsets, sources, weights = self.reverse
+        lo, hi = offsets[dst], offsets[dst + 1]
+        row_delta = self.reverse_delta.get(dst)
+        if not row_delta:
+            return zip(sources[lo:hi], weights[lo:hi])
+
+        merged = dict(zip(sources[lo:hi], weights[lo:hi]))
+        merged.update(row_delta)
+        return sorted((src, weight) for src, weight in merged.items() if weight != 0)
+
+    def _build_reverse(self) -> None:
+        """
+        Builds the reverse CSR (in-edges grouped by destination) with a counting sort over the current edges.
+        """
+        n = self.vertex_count
+        offsets = array('q', [0] * (n + 1))
+        for _, dst, _ in self.edges():
+            offsets[dst + 1] += 1
+        for v in range(n):
+            offsets[v + 1] += offsets[v]
+
+        # Going through sources in order keeps every reverse row sorted
+        fill = array('q', offsets)
+        sources = array('q', [0] * offsets[n])
+        weights = [0] * offsets[n]
+        for src, dst, weight in self.edges():
+            sources[fill[dst]] = src
+            weights[fill[dst]] = weight
+            fill[dst] += 1
+
+        self.reverse = (offsets, sources, _weight_array(weights))
+        self.reverse_delta = {}
+
+    def row(self, src: int) -> []:
+        row = [0] * self.vertex_count
+        for dst, weight in self.neighbors(src):
+            row[dst] = weight
+        return row
+
+    def edges(self):
+        for src in range(self.vertex_count):
+            for dst, weight in self.neighbors(src):
+                yield src, dst, weight
+
+    def bulk_set(self, src, dst, weights) -> None:
+        """
+        Sets many (already validated) edges at once and rebuilds the CSR arrays in a single pass. Later duplicates win,
+            like repeated set() calls.
+        """
+        self._before_write()
+        self.compact()
+        n = self.vertex_count
+        if np is not None:
+            self._bulk_set_numpy(n, src, dst, weights)
+            return
+
+        # Without numpy a dict keyed on (src, dst) takes care of the duplicates
+        merged = {(s, d): weight for s, d, weight in self.edges()}
+        merged.update(zip(zip(src, dst), weights))
+
+        offsets = array('q', [0] * (n + 1))
+        targets = array('q')
+        new_weights = []
+        for key in sorted(merged):
+            offsets[key[0] + 1] += 1
+            targets.append(key[1])
+            new_weights.append(merged[key])
+        for v in range(n):
+            offsets[v + 1] += offsets[v]
+
+        self.offsets, self.targets, self.weights = offsets, targets, _weight_array(new_weights)
+        self.edge_count = len(targets)
+        self.reverse = None
+
+    def _bulk_set_numpy(self, n: int, src, dst, weights) -> None:
+        """
+        Vectorized version of bulk_set(). Edges are encoded as src * n + dst keys, so a single sort puts them in CSR
+            order.
+        """
+        old_src = np.repeat(np.arange(n, dtype=np.int64), np.diff(np.asarray(self.offsets)))
+        keys = np.concatenate((old_src * n + np.asarray(self.targets),
+                               np.asarray(src, dtype=np.int64) * n + np.asarray(dst, dtype=np.int64)))
+        values = np.concatenate((np.asarray(self.weights), np.asarray(weights)))
+
+        # np.unique keeps the first copy of each key, so it runs on the reversed arrays to let the last copy win
+        keys, index = np.unique(keys[::-1], return_index=True)
+        values = values[::-1][index]
+
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // n, minlength=n), out=offsets[1:])
+        self.offsets = array('q', offsets.tobytes())
+        self.targets = array('q', (keys % n).tobytes())
+        if values.dtype.kind in 'biu':
+            self.weights = array('q', values.astype(np.int64).tobytes())
+        else:
+            self.weights = array('d', values.astype(np.float64).tobytes())
+        self.edge_count = len(keys)
+        self.reverse = None
+
+    def to_csr(self) -> ():
+        """
+        Returns the graph as (offsets, targets, weights) CSR arrays. These are the live arrays, so don't change them.
+        """
+        if self.delta:
+            self.compact()
+        return self.offsets, self.targets, self.weights
+
+    def compact(self) -> None:
+        """
+        Merges the delta layer back into fresh CSR arrays.
+        """
+        offsets = array('q', [0])
+        targets = array('q')
+        weights = []
+        for src in range(self.vertex_count):
+            for dst, weight in self.neighbors(src):
+                targets.append(dst)
+                weights.append(weight)
+            offsets.append(len(targets))
+
+        # Everything is new, so nothing is shared with a snapshot anymore
+        self.offsets, self.targets, self.weights = offsets, targets, _weight_array(weights)
+        self.delta = {}
+        self.degree_delta = {}
+        self.delta_size = 0
+        self.reverse = None
+        self.owned = None
+        self.shared_offsets = False
+
+
+class TopologicalOrder:
+    """
+    Keeps a topological order of a DirectedGraph up to date while edges are added one at a time (Pearce-Kelly dynamic
+    topological sort), so cycle checks don't need a full search of the graph.
+    - order[v] is the position of v, every edge goes from a lower position to a higher one
+    - cyclic is False while the order is valid, True once a cycle got in, and None when an edge was removed from a
+      cyclic graph and we don't know yet if it's still cyclic
+    """
+
+    def __init__(self, storage, reject: bool = False):
+        self.storage = storage
+        self.reject = reject
+        self.order = None
+        self.cyclic = None
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """
+        Recomputes the order from scratch with Kahn's algorithm.
+        """
+        n = self.storage.vertex_count
+        indegree = [0] * n
+        for _, dst, _ in self.storage.edges():
+            indegree[dst] += 1
+
+        queue = deque(v for v in range(n) if indegree[v] == 0)
+        order = [0] * n
+        position = 0
+        while queue:
+            vertex = queue.popleft()
+            order[vertex] = position
+            position += 1
+            for dst, _ in self.storage.neighbors(vertex):
+                indegree[dst] -= 1
+                if indegree[dst] == 0:
+                    queue.append(dst)
+
+        # Anything that never reached an in-degree of 0 sits on (or behind) a cycle
+        self.cyclic = position < n
+        self.order = None if self.cyclic else order
+
+    def vertex_added(self) -> None:
+        # A vertex without edges can go at the very end
+        if self.order is not None:
+            self.order.append(len(self.order))
+
+    def edge_added(self, src: int, dst: int) -> bool:
+        """
+        Updates the order for a new src -> dst edge. Returns False if the edge closes a cycle and we are rejecting
+            those, True if the edge can go in.
+        """
+        if self.cyclic is None:
+            self.rebuild()
+        if self.cyclic:
+            return True
+
+        order = self.order
+        lower, upper = order[dst], order[src]
+        if lower > upper:
+            return True
+
+        # Forward search from dst, only through vertices placed before src. Finding src means a cycle.
+        forward = self._search(dst, self.storage.neighbors, lambda v: order[v] < upper, src)
+        if forward is None:
+            if self.reject:
+                return False
+            self.cyclic = True
+            self.order = None
+            return True
+
+        # Backward search from src, only through vertices placed after dst
+        backward = self._search(src, self.storage.in_neighbors, lambda v: order[v] > lower)
+
+        # Everything that reaches src moves in front of everything dst reaches, reusing the same set of positions
+        backward.sort(key=order.__getitem__)
+        forward.sort(key=order.__getitem__)
+        slots = sorted(order[v] for v in backward + forward)
+        for vertex, slot in zip(backward + forward, slots):
+            order[vertex] = slot
+        return True
+
+    def edge_removed(self) -> None:
+        # Removing an edge never breaks a valid order, but it might break the only cycle
+        if self.cyclic:
+            self.cyclic = None
+
+    @staticmethod
+    def _search(start: int, edges, inside, target: int = None):
+        """
+        Iterative DFS from start through the vertices 'inside' accepts. Returns the visited vertices, or None if it
+            runs into target.
+        """
+        visited = {start}
+        stack = [start]
+        found = []
+        while stack:
+            vertex = stack.pop()
+            found.append(vertex)
+            for other, _ in edges(vertex):
+                if other == target:
+                    return None
+                if other not in visited and inside(other):
+                    visited.add(other)
+                    stack.append(other)
+        return found
+
+
+class ShortestPathCache:
+    """
+    LRU cache of full dijkstra results (distances and predecessors) per source vertex.
+    - every entry remembers the graph version it is valid for, and lookups only hit on the current version
+    - on an edit, entries the edit can't affect get moved up to the new version instead of being thrown away
+    - bounded by a number of entries and by the bytes the cached results take up
+    """
+
+    def __init__(self, max_entries: int = 64, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, src: int, version: int):
+        """
+        Returns the cached (distances, predecessors) for src, or None on a miss.
+        """
+        entry = self.entries.get(src)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(src)
+        self.hits += 1
+        return entry[1], entry[2]
+
+    def put(self, src: int, version: int, distances: [], predecessors: []) -> None:
+        self.discard(src)
+
+        # Predecessors always fit an array('q'), which getsizeof() measures exactly. Distances can be ints, floats or
+        #   inf, so they stay a list, and every distinct number object in it gets counted on top of the list itself
+        #   (except the small ints Python shares anyway).
+        predecessors = array('q', predecessors)
+        numbers = {id(distance): distance for distance in distances}
+        size = sys.getsizeof(distances) + sys.getsizeof(predecessors) + sum(
+            sys.getsizeof(number) for number in numbers.values() if not (type(number) is int and -5 <= number <= 256))
+        if size > self.max_bytes:
+            return
+        self.entries[src] = [version, distances, predecessors, size]
+        self.bytes += size
+        self._evict()
+
+    def _evict(self) -> None:
+        # Dropping the least recently used entries until we fit again
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, entry = self.entries.popitem(last=False)
+            self.bytes -= entry[3]
+            self.evictions += 1
+
+    def discard(self, src: int) -> None:
+        entry = self.entries.pop(src, None)
+        if entry is not None:
+            self.bytes -= entry[3]
+
+    def clear(self) -> None:
+        self.invalidations += len(self.entries)
+        self.entries.clear()
+        self.bytes = 0
+
+    def vertex_added(self, version: int) -> None:
+        # A new vertex has no edges yet, so it's just unreachable from every cached source. Every entry grows by one
+        #   more distance and predecessor, which gets counted the same way put() counts them.
+        for entry in self.entries.values():
+            distances, predecessors = entry[1], entry[2]
+            before = sys.getsizeof(distances) + sys.getsizeof(predecessors)
+            distance = float('inf')
+            distances.append(distance)
+            predecessors.append(-1)
+            growth = sys.getsizeof(distances) + sys.getsizeof(predecessors) - before + sys.getsizeof(distance)
+            entry[0] = version
+            entry[3] += growth
+            self.bytes += growth
+        self._evict()
+
+    def vertex_removed(self, version: int) -> None:
+        # The vertex already lost its edges one by one, and searches from it are turned away before the cache is asked
+        for entry in self.entries.values():
+            entry[0] = version
+
+    def edge_changed(self, src: int, dst: int, old, new, version: int) -> None:
+        """
+        Keeps the entries an edge change can't affect, and drops the rest.
+        - removing an edge or raising its weight only matters to trees that actually used it (predecessor of dst is src)
+        - adding an edge or lowering its weight only matters if it gives dst a strictly shorter path
+        """
+        stale = []
+        for key, entry in self.entries.items():
+            distances, predecessors = entry[1], entry[2]
+            if new == 0 or (old != 0 and new > old):
+                affected = predecessors[dst] == src
+            else:
+                affected = distances[src] + new < distances[dst]
+            if affected:
+                stale.append(key)
+            else:
+                entry[0] = version
+
+        for key in stale:
+            self.discard(key)
+        self.invalidations += len(stale)
+
+    def stats(self) -> dict:
+        return {'entries': len(self.entries), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'invalidations': self.invalidations}
+
+
+class LandmarkTable:
+    """
+    Shortest distances from and to a handful of landmark vertices, which astar() turns into lower bounds (the ALT
+    heuristic). By the triangle inequality, for any landmark L:
+        d(v, t) >= d(L, t) - d(L, v)    and    d(v, t) >= d(v, L) - d(t, L)
+    - landmarks are picked by farthest-point selection, each new one as far as possible from the ones already picked
+    - distances are kept in two flat array('d') tables, k * V doubles each, float('inf') where there is no path
+    - a table is only valid for the graph version it was built for
+    """
+
+    def __init__(self, landmarks: [], v_count: int, from_landmark: array, to_landmark: array, version: int):
+        self.landmarks = landmarks
+        self.v_count = v_count
+        self.from_landmark = from_landmark
+        self.to_landmark = to_landmark
+        self.version = version
+
+    @classmethod
+    def build(cls, graph, count: int = 8, seed: int = 0):
+        """
+        Picks up to count landmarks in graph and works out their distance tables (two dijkstra runs per landmark).
+            seed is the vertex the first landmark is picked farthest away from.
+        """
+        storage, n = graph._storage, graph.v_count
+
+        # Vertices without any edges would make useless landmarks
+        candidates = bytearray(n)
+        for src, dst, _ in storage.edges():
+            candidates[src] = candidates[dst] = 1
+
+        def tables(v):
+            return (_dijkstra_distances(storage.neighbors, n, v),
+                    _dijkstra_distances(storage.in_neighbors, n, v))
+
+        landmarks, from_landmark, to_landmark = [], array('d'), array('d')
+        if not any(candidates):
+            return cls(landmarks, n, from_landmark, to_landmark, graph.version)
+
+        # closeness[v] is the round-trip distance from v to the nearest landmark so far. Unreachable counts as the
+        #   farthest of all, which spreads landmarks over parts of the graph that can't reach each other.
+        forward, backward = tables(seed if 0 <= seed < n else candidates.index(1))
+        closeness = [f + b for f, b in zip(forward, backward)]
+        while len(landmarks) < count:
+            best = max((v for v in range(n) if candidates[v]), key=closeness.__getitem__)
+            if closeness[best] == 0:
+                break
+            forward, backward = tables(best)
+            landmarks.append(best)
+            from_landmark.extend(forward)
+            to_landmark.extend(backward)
+            candidates[best] = 0
+            if not any(candidates):
+                break
+
+            # The seed only chose the first landmark, after that it's the distance to the landmarks themselves
+            round_trip = [f + b for f, b in zip(forward, backward)]
+            if len(landmarks) == 1:
+                closeness = round_trip
+            else:
+                closeness = [min(c, r) for c, r in zip(closeness, round_trip)]
+
+        return cls(landmarks, n, from_landmark, to_landmark, graph.version)
+
+    def heuristic(self, dst: int):
+        """
+        Returns h(v), a lower bound on the distance from v to dst. h(v) is float('inf') when the tables prove there is
+            no path from v to dst at all, which lets astar() skip v outright.
+        """
+        n, inf = self.v_count, float('inf')
+        from_landmark, to_landmark = self.from_landmark, self.to_landmark
+
+        # A bound only says something when the distance it subtracts is finite: d(L, dst) - d(L, v) needs d(L, v), and
+        #   d(v, L) - d(dst, L) needs d(dst, L). That also keeps inf - inf out of it.
+        bounds = [(k * n, from_landmark[k * n + dst], to_landmark[k * n + dst]) for k in range(len(self.landmarks))]
+
+        def lower_bound(v: int):
+            best = 0
+            for base, from_dst, to_dst in bounds:
+                from_v = from_landmark[base + v]
+                if from_v != inf and from_dst - from_v > best:
+                    best = from_dst - from_v
+                if to_dst != inf and to_landmark[base + v] - to_dst > best:
+                    best = to_landmark[base + v] - to_dst
+            return best
+
+        return lower_bound
+
+
+class Condensation:
+    """
+    A DirectedGraph with every strongly connected component squashed into a single vertex, which always leaves a DAG.
+    - labels[v] is the component of vertex v, as one flat array('i'). Components are numbered in topological order, so
+      every edge between two of them goes from a lower number to a higher one.
+    - offsets/order list the members of each component, CSR style: component c is order[offsets[c]:offsets[c + 1]]
+    - dag is a SparseDirectedGraph with one vertex per component, an edge weighs as much as the lightest edge it
+      stands for. It's shared with whoever asks for it, so it shouldn't be edited.
+    - only valid for the graph version it was built for
+    """
+
+    def __init__(self, labels: array, offsets: array, order: array, dag, version: int):
+        self.labels = labels
+        self.offsets = offsets
+        self.order = order
+        self.dag = dag
+        self.version = version
+
+    @classmethod
+    def build(cls, graph):
+        """
+        Finds the components with an iterative version of Tarjan's algorithm (O(V + E), no recursion limit to run
+            into) and builds the condensed DAG from them.
+        """
+        n = graph.v_count
+        edge_offsets, targets, weights = graph._scan_csr()
+        unseen = -1
+        index = array('i', [unseen]) * n
+        low = array('i', [0]) * n
+        labels = array('i', [0]) * n
+        on_stack = bytearray(n)
+        next_edge = array('q', edge_offsets[:n])
+        stack = []
+        counter = 0
+        count = 0
+
+        # work is the DFS path, and next_edge[v] is where v picks its edge scan back up when the search returns to it
+        for root in range(n):
+            if index[root] != unseen:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            work = [root]
+            while work:
+                vertex = work[-1]
+                edge, end = next_edge[vertex], edge_offsets[vertex + 1]
+                while edge < end:
+                    dst = targets[edge]
+                    edge += 1
+                    if index[dst] == unseen:
+                        index[dst] = low[dst] = counter
+                        counter += 1
+                        stack.append(dst)
+                        on_stack[dst] = 1
+                        work.append(dst)
+                        break
+                    if on_stack[dst] and index[dst] < low[vertex]:
+                        low[vertex] = index[dst]
+                next_edge[vertex] = edge
+                if work[-1] != vertex:
+                    continue
+
+                work.pop()
+                if work and low[vertex] < low[work[-1]]:
+                    low[work[-1]] = low[vertex]
+
+                # vertex is the root of a component, which is everything above it on the stack
+                if low[vertex] == index[vertex]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        labels[member] = count
+                        if member == vertex:
+                            break
+                    count += 1
+
+        # Tarjan finishes components sinks first, so flipping the numbers around gives a topological order
+        last = count - 1
+        offsets = array('i', [0]) * (count + 1)
+        for v in range(n):
+            labels[v] = last - labels[v]
+            offsets[labels[v] + 1] += 1
+        for c in range(count):
+            offsets[c + 1] += offsets[c]
+        order = array('i', [0]) * n
+        filled = offsets[:count]
+        for v in range(n):
+            order[filled[labels[v]]] = v
+            filled[labels[v]] += 1
+
+        # Only the lightest edge between two components is kept, and the DAG gets its CSR arrays straight away
+        lightest = {}
+        for src in range(n):
+            src_label = labels[src]
+            for edge in range(edge_offsets[src], edge_offsets[src + 1]):
+                key = (src_label, labels[targets[edge]])
+                if key[0] != key[1] and weights[edge] < lightest.get(key, float('inf')):
+                    lightest[key] = weights[edge]
+        dag_offsets, dag_targets, dag_weights = array('q', [0]) * (count + 1), array('q'), []
+        for key in sorted(lightest):
+            dag_offsets[key[0] + 1] += 1
+            dag_targets.append(key[1])
+            dag_weights.append(lightest[key])
+        for c in range(count):
+            dag_offsets[c + 1] += dag_offsets[c]
+        dag = SparseDirectedGraph()
+        dag._storage = SparseStorage.from_csr(dag_offsets, dag_targets, _weight_array(dag_weights))
+        dag.v_count = count
+
+        return cls(labels, offsets, order, dag, graph.version)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def members(self, component: int) -> []:
+        return self.order[self.offsets[component]:self.offsets[component + 1]].tolist()
+
+    def size(self, component: int) -> int:
+        return self.offsets[component + 1] - self.offsets[component]
+
+    def cyclic_components(self) -> []:
+        """
+        Returns the components that contain a cycle, as lists of their vertices. Self loops aren't allowed, so that's
+            every component with more than one vertex.
+        """
+        return [self.members(c) for c in range(len(self)) if self.size(c) > 1]
+
+    def reaches(self, src_component: int, dst_component: int) -> bool:
+        """
+        Checks if there is a path from one component to another in the DAG. Component numbers only go up along an
+            edge, so the search never has to look past dst_component.
+        """
+        if src_component > dst_component:
+            return False
+        if src_component == dst_component:
+            return True
+
+        neighbors = self.dag._storage.neighbors
+        seen = {src_component}
+        stack = [src_component]
+        while stack:
+            for dst, _ in neighbors(stack.pop()):
+                if dst == dst_component:
+                    return True
+                if dst < dst_component and dst not in seen:
+                    seen.add(dst)
+                    stack.append(dst)
+        return False
+
+
+class _CountingStorage:
+    """
+    Stands in for the storage backend while an instrumented call runs, counting every neighbor lookup and every edge
+        handed out by it. Everything else goes straight through to the real backend.
+    """
+
+    def __init__(self, storage, probe):
+        self._storage = storage
+        self._probe = probe
+
+    def __getattr__(self, name):
+        return getattr(self._storage, name)
+
+    def neighbors(self, src: int):
+        probe = self._probe
+        probe.vertices += 1
+        for item in self._storage.neighbors(src):
+            probe.edges += 1
+            yield item
+
+
+class _RowView:
+    """
+    One row of DirectedGraph.adj_matrix. Reads go straight to the storage backend, writes go through the graph so its
+        version and caches keep up.
+    """
+
+    def __init__(self, graph, src: int):
+        self._graph = graph
+        self._src = src
+
+    def __len__(self) -> int:
+        return self._graph._storage.vertex_count
+
+    def __iter__(self):
+        return iter(self._graph._storage.row(self._src))
+
+    def __getitem__(self, dst: int):
+        return self._graph._storage.get(self._src, dst)
+
+    def __setitem__(self, dst: int, weight) -> None:
+        graph = self._graph
+        if not 0 <= dst < graph.v_count:
+            raise IndexError('adjacency matrix column out of range')
+
+        # Removed vertices don't get edges back, same as add_edge()
+        if weight != 0 and not (graph._is_live(self._src) and graph._is_live(dst)):
+            return
+        graph._set_weight(self._src, dst, weight)
+
+        # A write here skips the incremental cycle check, so the order gets recomputed on the next edit, like after a
+        #   bulk load
+        if graph._topo is not None:
+            if weight == 0:
+                graph._topo.edge_removed()
+            else:
+                graph._topo.cyclic = None
+                graph._topo.order = None
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class _MatrixView:
+    """
+    Read/write matrix view over a graph's storage backend, so adj_matrix[src][dst] keeps working for every backend.
+    """
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __len__(self) -> int:
+        return self._graph._storage.vertex_count
+
+    def __iter__(self):
+        for src in range(len(self)):
+            yield _RowView(self._graph, src)
+
+    def __getitem__(self, src: int) -> _RowView:
+        if not -len(self) <= src < len(self):
+            raise IndexError('adjacency matrix row out of range')
+        return _RowView(self._graph, src % len(self))
+
+    def __repr__(self) -> str:
+        return repr([list(row) for row in self])
+
+
+class _VerticesView(SetView):
+    """
+    Live view of the vertex ids of a DirectedGraph, dead ones left out. len() and 'in' are O(1).
+    """
+    __slots__ = ()
+
+    def __len__(self) -> int:
+        return self._graph.v_count - self._graph.dead_count
+
+    def __iter__(self):
+        graph = self._graph
+        dead = graph._dead
+        return (v for v in range(graph.v_count) if dead is None or not dead[v])
+
+    def __contains__(self, v) -> bool:
+        return self._graph._is_live(v)
+
+    def __repr__(self) -> str:
+        return f'vertices({list(self)})'
+
+
+class _EdgesView(SetView):
+    """
+    Live view of the (src, dst, weight) edges of a DirectedGraph, streamed from the storage without building a list.
+        len() is O(1), and 'in' takes a (src, dst, weight) triple or just a (src, dst) pair.
+    """
+    __slots__ = ()
+
+    def __len__(self) -> int:
+        return self._graph._storage.edge_count
+
+    def __iter__(self):
+        return self._graph._storage.edges()
+
+    def __contains__(self, edge) -> bool:
+        if not isinstance(edge, tuple) or len(edge) not in (2, 3):
+            return False
+        graph = self._graph
+        src, dst = edge[0], edge[1]
+        if not (graph._is_live(src) and graph._is_live(dst)):
+            return False
+        try:
+            weight = graph._storage.get(src, dst)
+            return weight != 0 and (len(edge) == 2 or weight == edge[2])
+        except TypeError:
+            return False
+
+    def __repr__(self) -> str:
+        return f'edges({list(self)})'
+
+
+class _NeighborsView(Mapping):
+    """
+    Live dst -> weight view of the out-edges of one DirectedGraph vertex. len() is O(1) from the storage's degree
+        counts, and lookups go straight to the storage.
+    """
+    __slots__ = ('_graph', '_src')
+
+    def __init__(self, graph, src: int):
+        self._graph = graph
+        self._src = src
+
+    def __len__(self) -> int:
+        return self._graph._storage.degree(self._src) if self._graph._is_live(self._src) else 0
+
+    def __iter__(self):
+        if not self._graph._is_live(self._src):
+            return iter(())
+        return (dst for dst, _ in self._graph._storage.neighbors(self._src))
+
+    def __getitem__(self, dst: int):
+        weight = 0
+        try:
+            if self._graph._is_live(self._src) and self._graph._is_live(dst):
+                weight = self._graph._storage.get(self._src, dst)
+        except TypeError:
+            raise KeyError(dst) from None
+        if weight == 0:
+            raise KeyError(dst)
+        return weight
+
+    def __contains__(self, dst) -> bool:
+        try:
+            return self._graph._is_live(dst) and self._graph._is_live(self._src) and \
+                self._graph._storage.get(self._src, dst) != 0
+        except TypeError:
+            return False
+
+    def items(self):
+        # (dst, weight) pairs straight from the storage, instead of one lookup per key
+        if not self._graph._is_live(self._src):
+            return iter(())
+        return iter(self._graph._storage.neighbors(self._src))
+
+    def __repr__(self) -> str:
+        return f'neighbors({dict(self.items())})'
+
+
 class DirectedGraph:
     """
     Class to implement directed weighted graph
@@ -56,77 +1251,440 @@ class DirectedGraph:
     MY CODE STARTS HERE!
     """
 
+    # Storage backend used for new graphs. SparseDirectedGraph swaps this for the CSR backend.
+    storage_class = DenseStorage
+
+    # Heap functions used by dijkstra, instrument() puts counting versions on the instance
+    _heap = (heappush, heappop)
+
+    # Methods instrument() wraps, and the GraphMetrics they report to while it's on
+    instrumented_operations = ('dfs', 'bfs', 'has_cycle', 'dijkstra', 'shortest_paths', 'shortest_path', 'astar',
+                               'strongly_connected_components', 'condensation', 'can_reach', 'topological_order',
+                               'dag_shortest_paths', 'dag_longest_paths')
+    metrics = None
+
+    # Fraction of vertex ids that can be dead before remove_vertex() calls compact() by itself. None leaves it to
+    #   explicit compact() calls, since compacting renumbers the vertices.
+    compaction_threshold = None
+
+    @property
+    def adj_matrix(self) -> _MatrixView:
+        """
+        Matrix view of the graph, adj_matrix[src][dst] is the edge weight (0 if there is no edge).
+        """
+        return _MatrixView(self)
+
+    @adj_matrix.setter
+    def adj_matrix(self, rows) -> None:
+        # Assigning a list of rows (like __init__ does with []) resets the storage backend
+        self._storage = self.storage_class()
+        self._topo = None
+        self.path_cache = None
+        self.landmarks = None
+        self._condensation = None
+        self._edge_index = None
+        self._dead = None
+        self._dead_shared = False
+        self.dead_count = 0
+        self.version = 0
+        self._storage.reserve(len(rows))
+        for _ in rows:
+            self._storage.add_vertex()
+        for src, row in enumerate(rows):
+            for dst, weight in enumerate(row):
+                if weight != 0:
+                    self._storage.set(src, dst, weight)
+        self.v_count = len(rows)
+
     def add_vertex(self) -> int:
         """
         Adds a vertex to the graph
         """
+        self._storage.add_vertex()
+        if self._dead is not None:
+            self._writable_dead().append(0)
         self.v_count += 1
-        new_vertex = []
-
-        # Have to make each list one longer to account for the new node
-        for list in self.adj_matrix:
-            list.append(0)
-
-        for x in range(self.v_count):
-            new_vertex.append(0)
-        self.adj_matrix.append(new_vertex)
+        self.version += 1
+        if self._topo is not None:
+            self._topo.vertex_added()
+        if self.path_cache is not None:
+            self.path_cache.vertex_added(self.version)
         return self.v_count
 
+    def reserve(self, n: int) -> None:
+        """
+        Preallocates space for n vertices in total, so the next add_vertex() calls up to that many are O(1).
+        """
+        self._storage.reserve(n)
+
     def add_edge(self, src: int, dst: int, weight=1) -> None:
         """
         Adds an edge between two nodes after making sure the two nodes are valid and not the same.
         """
         if weight <= 0:
             return
-        if src < 0 or src >= len(self.adj_matrix):
+        if not self._is_live(src):
             return
-        if dst < 0 or dst >= len(self.adj_matrix):
+        if not self._is_live(dst):
             return
         if dst == src:
             return
 
-        self.adj_matrix[src][dst] = weight
+        # With cycle tracking on, the topological order gets updated first (and may turn the edge away)
+        if self._topo is not None and not self._topo.edge_added(src, dst):
+            return
+
+        self._set_weight(src, dst, weight)
+
+    def try_add_edge(self, src: int, dst: int, weight=1) -> bool:
+        """
+        Adds an edge like add_edge(), unless the graph is acyclic and the edge would create a cycle. Returns True if
+            the edge is in the graph afterwards, False if it was turned away (or invalid). Turns on cycle tracking if it
+            isn't on yet.
+        """
+        if weight <= 0:
+            return False
+        if self._topo is None:
+            self.track_cycles()
+        reject = self._topo.reject
+        self._topo.reject = True
+        try:
+            self.add_edge(src, dst, weight)
+        finally:
+            self._topo.reject = reject
+        return 0 <= src < self.v_count and 0 <= dst < self.v_count and self._storage.get(src, dst) == weight
+
+    def track_cycles(self, reject: bool = False) -> None:
+        """
+        Turns on incremental cycle tracking. From then on add_edge() keeps a topological order up to date and
+            has_cycle() is a constant-time read. With reject=True, add_edge() skips any edge that would close a cycle.
+        """
+        self._topo = TopologicalOrder(self._storage, reject)
+
+    def untrack_cycles(self) -> None:
+        """
+        Turns incremental cycle tracking back off.
+        """
+        self._topo = None
 
     def remove_edge(self, src: int, dst: int) -> None:
         """
         Removes an edge from a graph after making sure the given vertices are valid.
         """
-        if src < 0 or src >= len(self.adj_matrix):
+        if src < 0 or src >= self.v_count:
             return
-        if dst < 0 or dst >= len(self.adj_matrix):
+        if dst < 0 or dst >= self.v_count:
             return
 
-        self.adj_matrix[src][dst] = 0
+        self._set_weight(src, dst, 0)
+        if self._topo is not None:
+            self._topo.edge_removed()
+
+    def remove_vertex(self, v: int):
+        """
+        Removes a vertex and every edge in or out of it in O(degree), leaving a tombstone so no other vertex id changes.
+            Searches skip dead vertices and edges can't be added to them, and their ids aren't reused until compact().
+            Returns the old-to-new id mapping if this removal made the graph compact itself (see compaction_threshold),
+            None otherwise.
+        """
+        if self._storage.read_only:
+            raise TypeError('graph snapshots are read-only')
+        if not self._is_live(v):
+            return None
+
+        # Going through _set_weight() keeps the path cache and the cycle tracking up to date edge by edge
+        storage = self._storage
+        for dst, _ in list(storage.neighbors(v)):
+            self._set_weight(v, dst, 0)
+        for src, _ in list(storage.in_neighbors(v)):
+            self._set_weight(src, v, 0)
+        if self._topo is not None:
+            self._topo.edge_removed()
+
+        if self._dead is None:
+            self._dead = bytearray(self.v_count)
+        self._writable_dead()[v] = 1
+        self.dead_count += 1
+        self.version += 1
+        if self.path_cache is not None:
+            self.path_cache.vertex_removed(self.version)
+
+        threshold = self.compaction_threshold
+        if threshold is not None and self.dead_count > threshold * self.v_count:
+            return self.compact()
+        return None
+
+    def compact(self) -> array:
+        """
+        Drops the dead vertices for good and numbers the live ones 0, 1, 2, ... in their old order, rebuilding the
+            storage in O(V + E). Returns the mapping as an array('i'), mapping[old id] is the new id or -1 for a
+            removed vertex.
+        """
+        if self._storage.read_only:
+            raise TypeError('graph snapshots are read-only')
+        dead = self._dead
+        mapping = array('i', range(self.v_count))
+        if dead is None:
+            return mapping
+
+        live = 0
+        for v in range(self.v_count):
+            if dead[v]:
+                mapping[v] = -1
+            else:
+                mapping[v] = live
+                live += 1
+
+        # A fresh storage leaves the old one to any snapshots still using it
+        src, dst, weights = [], [], []
+        for s, d, weight in self._storage.edges():
+            src.append(mapping[s])
+            dst.append(mapping[d])
+            weights.append(weight)
+        storage = self.storage_class()
+        storage.reserve(live)
+        for _ in range(live):
+            storage.add_vertex()
+        if src:
+            storage.bulk_set(src, dst, weights)
+
+        self._storage = storage
+        self.v_count = live
+        self._dead = None
+        self._dead_shared = False
+        self.dead_count = 0
+        self.version += 1
+        if self.path_cache is not None:
+            self.path_cache.clear()
+        if self._topo is not None:
+            self._topo = TopologicalOrder(storage, self._topo.reject)
+        return mapping
+
+    def _is_live(self, v: int) -> bool:
+        # Only integers (or things like NumPy ints that turn into one) can be vertex ids, 1.5 or '2' never are
+        try:
+            v = index(v)
+        except TypeError:
+            return False
+        return 0 <= v < self.v_count and (self._dead is None or not self._dead[v])
+
+    def _writable_dead(self) -> bytearray:
+        # A snapshot may still be reading our dead flags
+        if self._dead_shared:
+            self._dead = bytearray(self._dead)
+            self._dead_shared = False
+        return self._dead
+
+    def _set_weight(self, src: int, dst: int, weight) -> None:
+        """
+        Writes one edge weight (0 removes the edge), bumping the version and keeping the path cache in sync.
+        """
+        if self.path_cache is None:
+            self._storage.set(src, dst, weight)
+            self.version += 1
+            return
+        old = self._storage.get(src, dst)
+        self._storage.set(src, dst, weight)
+        self.version += 1
+        self.path_cache.edge_changed(src, dst, old, weight, self.version)
+
+    def add_edges_from(self, edges) -> None:
+        """
+        Adds many edges at once from an iterable of (src, dst) or (src, dst, weight) tuples (or an (m, 2)/(m, 3) NumPy
+            array). Invalid edges are skipped like in add_edge(), vertices that don't exist yet are created, and if an
+            edge shows up more than once the last weight wins.
+        """
+        if np is not None and isinstance(edges, np.ndarray):
+            ids = edges[:, :2].astype(np.int64)
+            self.add_edge_arrays(ids[:, 0], ids[:, 1], edges[:, 2] if edges.shape[1] > 2 else None)
+            return
+
+        src, dst, weights = array('q'), array('q'), []
+        for edge in edges:
+            src.append(edge[0])
+            dst.append(edge[1])
+            weights.append(edge[2] if len(edge) > 2 else 1)
+        self.add_edge_arrays(src, dst, weights)
+
+    @classmethod
+    def from_edge_array(cls, src, dst, weights=None):
+        """
+        Builds a new graph from parallel src/dst(/weights) sequences or NumPy arrays. The graph gets one vertex per id
+            up to the biggest one used, like passing start_edges to the constructor.
+        """
+        graph = cls()
+        graph.add_edge_arrays(src, dst, weights)
+        return graph
+
+    def add_edge_arrays(self, src, dst, weights=None) -> None:
+        """
+        Adds edges from parallel src/dst(/weights) sequences or NumPy arrays. They get validated in one pass, the graph
+            grows to fit them, and the storage backend takes them all at once. With track_cycles(reject=True) on they go
+            through add_edge() instead, so edges that would close a cycle get skipped.
+        """
+        if np is not None and isinstance(self._storage, SparseStorage):
+            src = np.asarray(src, dtype=np.int64)
+            dst = np.asarray(dst, dtype=np.int64)
+            weights = np.ones(len(src), dtype=np.int64) if weights is None else np.asarray(weights)
+            keep = (weights > 0) & (src >= 0) & (dst >= 0) & (src != dst)
+            if self._dead is not None:
+                # Removed vertices keep their ids, and no edge gets to use them again until compact()
+                dead = np.frombuffer(self._dead, dtype=np.uint8).copy()
+                for ids in (src, dst):
+                    keep &= (ids >= len(dead)) | (dead[np.minimum(ids, len(dead) - 1)] == 0)
+            src, dst, weights = src[keep], dst[keep], weights[keep]
+            if len(src) == 0:
+                return
+            top = int(max(src.max(), dst.max()))
+        else:
+            # The dense backend sets cells one by one anyway, so plain Python values are all it needs
+            src, dst = _as_list(src), _as_list(dst)
+            weights = [1] * len(src) if weights is None else _as_list(weights)
+            kept = [(s, d, weight) for s, d, weight in zip(src, dst, weights)
+                    if weight > 0 and s >= 0 and d >= 0 and s != d]
+            dead = self._dead
+            if dead is not None:
+                kept = [edge for edge in kept if (edge[0] >= len(dead) or not dead[edge[0]])
+                        and (edge[1] >= len(dead) or not dead[edge[1]])]
+            if not kept:
+                return
+            src, dst, weights = zip(*kept)
+            top = max(max(src), max(dst))
+
+        # Making sure every vertex id used exists before any edges go in
+        self.reserve(top + 1)
+        while self.v_count <= top:
+            self.add_vertex()
+
+        # When cycle-closing edges are being turned away, every edge has to pass that check, so they go in one by one
+        if self._topo is not None and self._topo.reject:
+            for s, d, weight in zip(_as_list(src), _as_list(dst), _as_list(weights)):
+                self.add_edge(s, d, weight)
+            return
+
+        self._storage.bulk_set(src, dst, weights)
+        self.version += 1
+        if self.path_cache is not None:
+            self.path_cache.clear()
+
+        # Bulk loads don't go through the incremental cycle check, the order gets recomputed on the next edit instead
+        if self._topo is not None:
+            self._topo.cyclic = None
+            self._topo.order = None
+
+    def save(self, path) -> None:
+        """
+        Writes the graph to a binary file (header + CSR arrays) that load() can map straight back into memory. Removed
+            vertices are written as tombstones, so ids stay the same after loading.
+        """
+        offsets, targets, weights = self._storage.to_csr()
+        dead = self._dead if self.dead_count else None
+
+        # The arrays might be mapped from path itself (or other graphs might have it mapped), and truncating a mapped
+        #   file kills whoever reads it next. So the new file is written beside it and swapped in, which leaves the
+        #   old one readable until its last mapping goes away.
+        temp_path = f'{os.fspath(path)}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'wb') as file:
+                file.write(_HEADER.pack(FILE_MAGIC, FILE_VERSION, self.v_count, len(targets),
+                                        _typecode(weights).encode(), dead is not None))
+                for data in (offsets, targets, weights):
+                    file.write(_little_endian(data))
+                if dead is not None:
+                    file.write(bytes(dead) + bytes(-len(dead) % 8))
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, mmap: bool = True):
+        """
+        Reads a graph written by save(). With mmap=True the file is memory-mapped and the graph runs on top of the
+            mapped CSR arrays without parsing or copying them, so processes loading the same file share one copy from
+            the page cache. Such a graph always uses sparse storage, and edits go to its delta layer, never the file.
+        """
+        # Mapping only works when the file's byte order matches ours, otherwise we fall back to reading it in
+        mapped = mmap and sys.byteorder == 'little'
+        with open(path, 'rb') as file:
+            if mapped:
+                data = mmap_module.mmap(file.fileno(), 0, access=mmap_module.ACCESS_READ)
+            else:
+                data = file.read()
+
+        magic, version, v_count, e_count, typecode, has_dead = _HEADER.unpack_from(data)
+        if magic != FILE_MAGIC:
+            raise ValueError(f'{path} is not a DirectedGraph file')
+        if version not in (1, FILE_VERSION):
+            raise ValueError(f'unsupported DirectedGraph file version {version}')
+
+        # Slicing the file into the three arrays (memoryviews are zero-copy views of the mapping)
+        typecode = typecode.decode()
+        view = memoryview(data)
+        start = _HEADER.size
+        arrays = []
+        for code, length in (('q', v_count + 1), ('q', e_count), (typecode, e_count)):
+            part = view[start:start + length * 8].cast(code)
+            if not mapped:
+                part = array(code, part)
+                if sys.byteorder != 'little':
+                    part.byteswap()
+            arrays.append(part)
+            start += length * 8
+
+        graph = cls()
+        if not mapped and cls.storage_class is not SparseStorage:
+            graph.reserve(v_count)
+            for _ in range(v_count):
+                graph.add_vertex()
+            offsets, targets, weights = arrays
+            sources = [src for src in range(v_count) for _ in range(offsets[src + 1] - offsets[src])]
+            graph._storage.bulk_set(sources, targets, weights)
+        else:
+            graph._storage = SparseStorage.from_csr(*arrays)
+            graph._storage.mapping = data
+            graph.v_count = v_count
+
+        # Tombstones are tiny next to the edges, so they always get copied into memory
+        if has_dead:
+            graph._dead = bytearray(view[start:start + v_count])
+            graph.dead_count = v_count - graph._dead.count(0)
+        return graph
 
     def get_vertices(self) -> []:
         """
         Returns a list of all the vertices in the graph.
         """
-        vertex_list = []
-        vertex = 0
-        for x in range(self.v_count):
-            vertex_list.append(vertex)
-            vertex += 1
-
-        return vertex_list
+        if self._dead is not None:
+            return [v for v in range(self.v_count) if not self._dead[v]]
+        return list(range(self.v_count))
 
     def get_edges(self) -> []:
         """
         Returns a list of all the edges in the graph as a tuple (source, destination, weight)
         """
-        source = 0
-        edge_list = []
+        return list(self._storage.edges())
 
-        # Since vertices are just in numerical order, a simple counter keeps track of source and destination
-        for x in self.adj_matrix:
-            destination = 0
-            for weight in x:
-                if weight != 0:
-                    edge_list.append((source, destination, weight))
-                destination += 1
-            source += 1
+    def vertices(self) -> _VerticesView:
+        """
+        Returns a live, set-like view of the vertex ids. Unlike get_vertices() nothing gets copied, and it keeps up with
+            later changes to the graph.
+        """
+        return _VerticesView(self)
+
+    def edges(self) -> _EdgesView:
+        """
+        Returns a live, set-like view of the (src, dst, weight) edges, with an O(1) len(). Iterating it streams the
+            edges straight from the storage.
+        """
+        return _EdgesView(self)
 
-        return edge_list
+    def neighbors(self, v: int) -> _NeighborsView:
+        """
+        Returns a live dst -> weight mapping of the out-edges of v, with an O(1) len().
+        """
+        return _NeighborsView(self, v)
 
     def is_valid_path(self, path: []) -> bool:
         """
@@ -139,179 +1697,611 @@ class DirectedGraph:
         if len(path) == 0:
             return True
         if len(path) == 1:
-            if 0 <= path[0] < len(self.adj_matrix):
+            if self._is_live(path[0]):
                 return True
             else:
                 return False
 
         # Checking if each vertex in 'path' has a weighted edge with the previous vertex (and that the vertex is valid)
         while index != len(path):
-            if len(self.adj_matrix) <= path[index] < 0:
+            if not 0 <= path[index] < self.v_count:
                 return False
-            if len(self.adj_matrix) <= path[index - 1] < 0:
+            if not 0 <= path[index - 1] < self.v_count:
                 return False
-            if self.adj_matrix[path[index - 1]][path[index]] == 0:
+            if self._storage.get(path[index - 1], path[index]) == 0:
                 return False
             index += 1
 
         return True
 
+    def validate_paths(self, paths, offsets=None) -> ():
+        """
+        Checks many paths at once, with the same answers as is_valid_path(). paths is a list of vertex lists, or one
+            flat sequence (like a NumPy array) of all the paths back to back, with path k at offsets[k]:offsets[k + 1].
+            Returns (valid, first_invalid): valid[k] says if path k is valid, and first_invalid[k] is the position in
+            path k of the first vertex that doesn't exist or has no edge from the one before it, -1 for a valid path.
+            Both are NumPy arrays, or lists without NumPy.
+        """
+        flat, offsets = split_paths(paths, offsets)
+        if np is None:
+            return check_paths_python(flat, offsets, self._is_live, lambda src, dst: self._storage.get(src, dst) != 0)
+
+        n = self.v_count
+        ids = np.asarray(flat, dtype=np.int64)
+        known = (ids >= 0) & (ids < n)
+        if self._dead is not None:
+            known[known] = np.frombuffer(self._dead, dtype=np.uint8)[ids[known]] == 0
+
+        # A NumPy copy of the CSR arrays to search, made once per graph version
+        if self._edge_index is None or self._edge_index[0] != self.version:
+            self._edge_index = (self.version, csr_index(*self._storage.to_csr()[:2]))
+        return check_paths(ids, offsets, known, self._edge_index[1])
+
     def dfs(self, v_start, v_end=None) -> []:
         """
         Uses depth-first-search to return a list of all connected vertices from a source vertex.
         """
-        def dfs_rec(stack, vertex, end=None):
-            """
-            Helper function for dfs. Decided to go recursive this time. Seemed easier.
-            """
+        return list(self.iter_dfs(v_start, v_end))
 
-            # Check if we hit the end-vertex
-            if vertex == end:
+    def bfs(self, v_start, v_end=None) -> []:
+        """
+        Uses breadth-first-search to return a list of all connected vertices from a source vertex.
+        """
+        return list(self.iter_bfs(v_start, v_end))
+
+    def iter_dfs(self, v_start, v_end=None):
+        """
+        Generator version of dfs(). Yields vertices one at a time in the same order dfs() lists them, so callers can
+            stop early without the whole visit list being built.
+        """
+        if not self._is_live(v_start) or v_start == v_end:
+            return
+
+        # Stack of neighbor iterators instead of recursion, so long chains don't hit the recursion limit. Each
+        #   iterator remembers how far we got through that vertex's edges.
+        neighbors = self._storage.neighbors
+        visited = bytearray(self.v_count)
+        visited[v_start] = 1
+        yield v_start
+        stack = [iter(neighbors(v_start))]
+
+        while stack:
+            for vertex, _ in stack[-1]:
+                if not visited[vertex]:
+                    visited[vertex] = 1
+                    yield vertex
+
+                    # The end-vertex still gets listed, we just don't go any deeper from it
+                    if vertex != v_end:
+                        stack.append(iter(neighbors(vertex)))
+                    break
+            else:
+                stack.pop()
+
+    def iter_bfs(self, v_start, v_end=None):
+        """
+        Generator version of bfs(). Yields vertices one at a time in the same order bfs() lists them.
+        """
+        if not self._is_live(v_start) or v_start == v_end:
+            return
+
+        # Vertices are marked when they get queued, so every vertex goes through the queue at most once
+        neighbors = self._storage.neighbors
+        visited = bytearray(self.v_count)
+        visited[v_start] = 1
+        queue = deque([v_start])
+
+        while queue:
+            vertex = queue.popleft()
+
+            # Reaching the end-vertex stops the whole search (and it doesn't get listed)
+            if vertex == v_end:
                 return
+            yield vertex
 
-            # Adding vertex to the stack if it hasn't already been added
-            if vertex not in stack:
-                stack.append(vertex)
+            for dst, _ in neighbors(vertex):
+                if not visited[dst]:
+                    visited[dst] = 1
+                    queue.append(dst)
 
-            # Going through and recurring when we find an edge to a new vertex.
-            counter = 0
-            for x in self.adj_matrix[vertex]:
-                if x != 0:
-                    if counter not in stack:
-                        stack.append(counter)
-                        dfs_rec(stack, counter, end)
-                counter += 1
+    def has_cycle(self):
+        """
+        Checking if the graph contains a cycle, then returns 'True' if it does, and 'False' if it does not.
+        """
 
-        # Setting up and recalling the recursive function
-        stack = []
-        dfs_rec(stack, v_start, v_end)
+        # With cycle tracking on, the answer is already known
+        if self._topo is not None:
+            if self._topo.cyclic is None:
+                self._topo.rebuild()
+            return self._topo.cyclic
+
+        # Colouring depth-first search: 0 = not seen, 1 = on the current path, 2 = finished. Running into a vertex
+        #   that is still on the current path means we found a back edge, which means a cycle.
+        colour = bytearray(self.v_count)
+        for start in range(self.v_count):
+            if colour[start] != 0:
+                continue
+            colour[start] = 1
+            stack = [(start, iter(self._storage.neighbors(start)))]
+            while stack:
+                vertex, edges = stack[-1]
+                for dst, _ in edges:
+                    if colour[dst] == 1:
+                        return True
+                    if colour[dst] == 0:
+                        colour[dst] = 1
+                        stack.append((dst, iter(self._storage.neighbors(dst))))
+                        break
+                else:
+                    colour[vertex] = 2
+                    stack.pop()
 
-        # I feel like I was supposed to use the stack to make a different list, but that didn't work and this did, so
-        #   please don't be mad. Probably a slightly faster way to do this.
-        return stack
+        return False
 
-    def bfs(self, v_start, v_end=None) -> []:
+    def dijkstra(self, src: int, dst: int = None) -> []:
         """
-        Uses depth-first-search to return a list of all connected vertices from a source vertex.
+        Returns a list of all the shortest weights to get to each vertex from a source. If dst is given the search stops
+            as soon as dst is settled, so only the distances of vertices settled before it are final.
         """
+        return self.shortest_paths(src, dst)[0]
 
-        def bfs_rec(queue, list, end=None):
-            """
-            Helper function for 'bfs'.
-            """
+    def shortest_paths(self, src: int, dst: int = None) -> ():
+        """
+        Runs dijkstra from src and returns (distances, predecessors). predecessors[v] is the vertex before v on its
+            shortest path, or -1 for the source and unreachable vertices. Stops early once dst (if given) is settled.
+        """
+        distances = [float('inf')] * self.v_count
+        predecessors = [-1] * self.v_count
+        if not self._is_live(src):
+            return distances, predecessors
+
+        # With the cache on we always work out the whole tree, since that's what can be reused later
+        if self.path_cache is not None:
+            cached = self.path_cache.get(src, self.version)
+            if cached is None:
+                cached = self._dijkstra(src, None, distances, predecessors)
+                self.path_cache.put(src, self.version, *cached)
+            return list(cached[0]), list(cached[1])
+
+        return self._dijkstra(src, dst, distances, predecessors)
+
+    def _dijkstra(self, src: int, dst, distances: [], predecessors: []) -> ():
+        """
+        The actual dijkstra search, filling in the given distance and predecessor lists.
+        """
 
-            # Stop everything if the queue is empty
-            if len(queue) <= 0:
-                return
+        # Binary heap of (distance, vertex). A vertex can be pushed more than once, stale entries get skipped when
+        #   popped because the vertex is already settled.
+        settled = bytearray(self.v_count)
+        distances[src] = 0
+        heap = [(0, src)]
+        neighbors = self._storage.neighbors
+        push, pop = self._heap
+        while heap:
+            distance, vertex = pop(heap)
+            if settled[vertex]:
+                continue
+            settled[vertex] = 1
+            if vertex == dst:
+                break
+
+            for dst_vertex, weight in neighbors(vertex):
+                new_distance = distance + weight
+                if new_distance < distances[dst_vertex]:
+                    distances[dst_vertex] = new_distance
+                    predecessors[dst_vertex] = vertex
+                    push(heap, (new_distance, dst_vertex))
+
+        return distances, predecessors
+
+    def multi_source_dijkstra(self, sources, processes: int = None, chunksize: int = 1):
+        """
+        Runs dijkstra from every vertex in sources on a pool of worker processes. Yields (source, distances) pairs in
+            the order of sources as soon as they are done. Distances come back as array('d') rows, so integer weights
+            show up as floats and unreachable vertices as inf.
+        """
+        sources = [src for src in sources if self._is_live(src)]
+        if not sources:
+            return
+        csr = self._storage.to_csr()
 
-            vertex = queue.pop(0)
+        # Not worth starting processes for a single worker
+        if processes == 1 or len(sources) == 1:
+            for src in sources:
+                yield src, _csr_dijkstra(*csr, src)
+            return
 
-            # Checking if we've reached the end point
-            if vertex == end:
-                return
+        # The CSR arrays go into shared memory once, workers map them instead of getting a pickled copy per task
+        blocks = []
+        try:
+            for data in csr:
+                block = SharedMemory(create=True, size=max(1, len(data) * data.itemsize))
+                block.buf[:len(data) * data.itemsize] = data.tobytes()
+                blocks.append(block)
+            info = [(block.name, _typecode(data), len(data)) for block, data in zip(blocks, csr)]
+            with get_context().Pool(processes, initializer=_attach_csr, initargs=(info,)) as pool:
+                yield from pool.imap(_worker_dijkstra, sources, chunksize)
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def all_pairs_shortest_paths(self, processes: int = None, chunksize: int = 16):
+        """
+        Streams the full distance matrix one row at a time as (source, distances) pairs, spread over a process pool.
+        """
+        return self.multi_source_dijkstra(range(self.v_count), processes, chunksize)
 
-            # Adding vertex to the list if it isn't there yet
-            if vertex not in list:
-                list.append(vertex)
-
-            # Making a list of all connected vertices, adding them to a queue, then recurring
-            counter = 0
-            sort_list = []
-            for x in self.adj_matrix[vertex]:
-                if x != 0:
-                    if counter not in list:
-                        sort_list.append(counter)
-                counter += 1
-            sort_list.sort()
-            for el in sort_list:
-                queue.append(el)
-            bfs_rec(queue, list, end)
-
-        # Returning a blank list if we have an invalid v_start
-        if v_start < 0 or v_start >= len(self.adj_matrix):
+    def weight_matrix(self):
+        """
+        Returns the graph as a V x V NumPy float array. Missing edges are inf and the diagonal is 0. Needs NumPy.
+        """
+        if np is None:
+            raise ImportError('weight_matrix() needs NumPy')
+        n = self.v_count
+        offsets, targets, weights = self._storage.to_csr()
+        matrix = np.full((n, n), np.inf)
+        sources = np.repeat(np.arange(n), np.diff(np.asarray(offsets)))
+        matrix[sources, np.asarray(targets, dtype=np.int64)] = np.asarray(weights, dtype=np.float64)
+        np.fill_diagonal(matrix, 0)
+        return matrix
+
+    def floyd_warshall(self) -> ():
+        """
+        All-pairs shortest paths with a vectorized Floyd-Warshall. Returns (distances, next_hop) NumPy arrays, where
+            next_hop[u][v] is the vertex after u on a shortest path to v (-1 if v can't be reached). Needs NumPy.
+        """
+        distances = self.weight_matrix()
+        n = self.v_count
+
+        # To start with, the next hop towards a neighbor is the neighbor itself
+        next_hop = np.where(np.isfinite(distances), np.arange(n)[None, :], -1)
+        np.fill_diagonal(next_hop, np.arange(n))
+
+        # Each round lets paths go through vertex k. The whole matrix gets updated at once instead of with a double
+        #   loop, reusing the same two scratch buffers every round.
+        through_k = np.empty_like(distances)
+        better = np.empty(distances.shape, dtype=bool)
+        for k in range(n):
+            np.add(distances[:, k, None], distances[None, k, :], out=through_k)
+            np.less(through_k, distances, out=better)
+            np.copyto(distances, through_k, where=better)
+            np.copyto(next_hop, next_hop[:, k, None], where=better)
+
+        return distances, next_hop
+
+    @staticmethod
+    def next_hop_path(next_hop, src: int, dst: int) -> []:
+        """
+        Turns a next_hop matrix from floyd_warshall() into the list of vertices from src to dst (empty if there is no
+            path).
+        """
+        if next_hop[src][dst] == -1:
             return []
+        path = [src]
+        while path[-1] != dst:
+            path.append(int(next_hop[path[-1]][dst]))
+        return path
 
-        # Setting up and recalling the recursive function
-        queue = [v_start]
-        list = []
-        bfs_rec(queue, list, v_end)
+    def transitive_closure(self):
+        """
+        Returns a V x V boolean NumPy array where [u][v] is True if v can be reached from u (every vertex reaches
+            itself). Needs NumPy.
+        """
+        if np is None:
+            raise ImportError('transitive_closure() needs NumPy')
+
+        # Squaring the reachability matrix doubles the path lengths it covers, so about log2(V) matrix products are
+        #   enough. float32 keeps the products on the fast BLAS path.
+        reach = np.isfinite(self.weight_matrix()).astype(np.float32)
+        while True:
+            squared = (reach @ reach) > 0
+            if np.array_equal(squared, reach > 0):
+                return squared
+            reach = squared.astype(np.float32)
+
+    def enable_path_cache(self, max_entries: int = 64, max_bytes: int = 64 * 1024 * 1024) -> ShortestPathCache:
+        """
+        Turns on caching of dijkstra results per source. Returns the cache, which also has the hit/miss stats.
+        """
+        self.path_cache = ShortestPathCache(max_entries, max_bytes)
+        return self.path_cache
 
-        return list
+    def disable_path_cache(self) -> None:
+        self.path_cache = None
 
-    def has_cycle(self):
+    def instrument(self, metrics: GraphMetrics = None) -> GraphMetrics:
         """
-        Checking if the graph contains a cycle, then returns 'True' if it does, and 'False' if it does not.
+        Starts counting vertices visited, edges scanned, heap pushes/pops and time for every call to the methods in
+            instrumented_operations. Returns the GraphMetrics they go into (a new one unless metrics is given).
         """
+        return instrument(self, self.instrumented_operations, metrics)
 
-        # Making my own deep-copy of our graph list ('self.adj_matrix')
-        list_copy = []
-        counter = 0
-        for x in self.adj_matrix:
-            list_copy.append([])
-            for y in x:
-                list_copy[counter].append(y)
-            counter += 1
+    def uninstrument(self) -> None:
+        uninstrument(self, self.instrumented_operations)
 
-        # Going through and removing all vertices with only one or zero connections from the copy. If values still,
-        #   then they are part of a cycle. If none remain, then the graph has no cycle.
-        counter = 0
-        while len(list_copy) > 0:
+    def _start_counting(self, probe):
+        """
+        Points the storage and heap at probe for one instrumented call, and returns the function that undoes it.
+        """
+        storage = self._storage
+        self._storage = _CountingStorage(storage, probe)
 
-            # Checking if we've reached the end of the list without removing anything
-            if counter == len(list_copy):
-                return True
+        def push(heap, item):
+            probe.pushes += 1
+            heappush(heap, item)
 
-            # Counting the number of connections
-            connections = 0
-            for y in list_copy[counter]:
-                if y != 0:
-                    connections += 1
+        def pop(heap):
+            probe.pops += 1
+            return heappop(heap)
 
-            # If there are not enough connections, remove the vertex and it's edge-weight value from all lists
-            if connections < 1:
-                list_copy.pop(counter)
-                for x in list_copy:
-                    x.pop(counter)
+        self._heap = (push, pop)
 
-                # We start from the beginning after a removal to re-check all vertices
-                counter = 0
-            else:
-                counter += 1
-        return False
+        def restore():
+            self._storage = storage
+            del self._heap
+
+        return restore
 
-    def dijkstra(self, src: int) -> []:
+    def _scan_csr(self) -> ():
         """
-        Returns a list of all the shortest weights to get to each vertex from a source.
+        Returns the storage's CSR arrays for a search that walks them directly. That goes around the counting storage,
+            so an instrumented call counts the whole scan here instead.
         """
-        visited = []
+        offsets, targets, weights = self._storage.to_csr()
+        probe = getattr(self, '_probe', None)
+        if probe is not None:
+            probe.vertices += self.v_count
+            probe.edges += len(targets)
+        return offsets, targets, weights
+
+    def shortest_path(self, src: int, dst: int) -> []:
+        """
+        Returns the vertices on a shortest path from src to dst (both included), or an empty list if dst can't be
+            reached.
+        """
+        if not self._is_live(dst):
+            return []
+        distances, predecessors = self.shortest_paths(src, dst)
+        if distances[dst] == float('inf'):
+            return []
 
-        # Filling all values with 'inf' in case the vertices can't be reached
-        for x in range(self.v_count):
-            visited.append(float('inf'))
-        priority_queue = [(src, 0)]
+        # Walking the predecessor links back from dst, then flipping the list around
+        path = [dst]
+        while path[-1] != src:
+            path.append(predecessors[path[-1]])
+        path.reverse()
+        return path
 
-        # Using dijkstra's formula to add up the shortest distances from the source
-        while len(priority_queue) != 0:
-            v = priority_queue.pop(0)
+    def snapshot(self):
+        """
+        Returns a read-only copy of the graph as it is right now, in O(1). The two share their storage, and whichever
+            rows this graph writes to afterwards get copied first, so the snapshot never changes and readers of it never
+            hold up writers of this one. Every read method works on a snapshot, and writing to one raises TypeError.
+        """
+        # Skipping __init__, which would reset the storage
+        frozen = object.__new__(type(self))
+        frozen._storage = self._storage.snapshot()
+        frozen.v_count = self.v_count
+        frozen.version = self.version
+        frozen._topo = None
+        frozen.path_cache = None
+
+        # The dead flags get copied by whichever side writes to them first, which is always us
+        frozen._dead = self._dead
+        frozen._dead_shared = False
+        frozen.dead_count = self.dead_count
+        self._dead_shared = self._dead is not None
+
+        # Landmark tables and condensations are never written to, and they know which version they belong to
+        frozen.landmarks = self.landmarks
+        frozen._condensation = self._condensation
+        frozen._edge_index = self._edge_index
+        return frozen
+
+    def prepare_landmarks(self, count: int = 8, seed: int = 0) -> LandmarkTable:
+        """
+        Picks count landmark vertices and precomputes their distance tables for ALT searches (see astar()). Costs two
+            dijkstra runs per landmark, so it pays off on a graph that stays the same over many queries. An edit makes
+            the tables stale, and the next ALT search rebuilds them.
+        """
+        self.landmarks = LandmarkTable.build(self, count, seed)
+        return self.landmarks
 
-            # Was having some trouble with higher weights overwriting, but this inequality statement wasn't in the
-            #   pseudocode, so I hope  its not cheating
-            if visited[v[0]] == float('inf') or visited[v[0]] > v[1]:
-                visited[v[0]] = v[1]
-                index = 0
-                for el in self.adj_matrix[v[0]]:
-                    if el != 0:
-                        priority_queue.append((index, el + v[1]))
-                    index += 1
+    def astar(self, src: int, dst: int, heuristic=None) -> ():
+        """
+        A* search from src to dst. Returns (distance, path), or (float('inf'), []) if dst can't be reached.
+        - heuristic(v) has to be a consistent lower bound on the distance from v to dst, float('inf') meaning dst can't
+          be reached from v
+        - heuristic=None uses the landmark tables if prepare_landmarks() was called, and is plain dijkstra otherwise
+        - heuristic='alt' always uses landmarks, preparing the default ones if needed
+        """
+        if not self._is_live(src) or not self._is_live(dst):
+            return float('inf'), []
+
+        if heuristic is None or heuristic == 'alt':
+            table = self.landmarks
+            if table is None and heuristic == 'alt':
+                table = self.prepare_landmarks()
+            elif table is not None and table.version != self.version:
+                table = self.prepare_landmarks(len(table.landmarks))
+            heuristic = table.heuristic(dst) if table is not None else None
+
+        # Scores (distance so far plus the estimate) go in the heap. Vertices only get their estimate worked out once,
+        #   and ones that provably can't reach dst never go in at all.
+        inf = float('inf')
+        neighbors = self._storage.neighbors
+        push, pop = self._heap
+        distances = {src: 0}
+        predecessors = {src: -1}
+        estimates = {}
+        settled = set()
+        heap = [(0, 0, src)]
+        while heap:
+            _, distance, vertex = pop(heap)
+            if vertex in settled:
+                continue
+            settled.add(vertex)
+            if vertex == dst:
+                path = [dst]
+                while path[-1] != src:
+                    path.append(predecessors[path[-1]])
+                path.reverse()
+                return distance, path
+
+            for dst_vertex, weight in neighbors(vertex):
+                new_distance = distance + weight
+                if new_distance < distances.get(dst_vertex, inf):
+                    estimate = estimates.get(dst_vertex)
+                    if estimate is None:
+                        estimate = estimates[dst_vertex] = heuristic(dst_vertex) if heuristic is not None else 0
+                    if estimate == inf:
+                        continue
+                    distances[dst_vertex] = new_distance
+                    predecessors[dst_vertex] = vertex
+                    push(heap, (new_distance + estimate, new_distance, dst_vertex))
+
+        return inf, []
+
+    def strongly_connected_components(self) -> array:
+        """
+        Returns the strongly connected component of every vertex as an array('i'), numbered in topological order of
+            the condensed graph (see condensation()).
+        """
+        return array('i', self.condensation().labels)
 
-        return visited
+    def condensation(self) -> Condensation:
+        """
+        Returns the graph with each strongly connected component squashed into one vertex. It's built in O(V + E) the
+            first time and kept until the graph changes.
+        """
+        if self._condensation is None or self._condensation.version != self.version:
+            self._condensation = Condensation.build(self)
+        return self._condensation
 
+    def can_reach(self, src: int, dst: int) -> bool:
+        """
+        Checks if there is a path from src to dst, searching the condensed graph instead of the whole one.
+        """
+        if not self._is_live(src) or not self._is_live(dst):
+            return False
+        condensed = self.condensation()
+        return condensed.reaches(condensed.labels[src], condensed.labels[dst])
+
+    def topological_order(self, levels: bool = False):
+        """
+        Returns the vertices in topological order as an array('i') (Kahn's algorithm), or an empty one if the graph has
+            a cycle. With levels=True it returns (order, levels), where levels[i] is the number of edges on the longest
+            chain leading into order[i]. The order goes level by level, and every vertex on a level can be scheduled as
+            soon as the levels before it are done.
+        """
+        order, depths = self._kahn(levels)
+        if len(order) < self.v_count - self.dead_count:
+            order, depths = array('i'), array('i')
+        return (order, depths) if levels else order
+
+    def _kahn(self, levels: bool = False) -> ():
+        """
+        Kahn's algorithm over the CSR arrays. Returns (order, levels), where order is short of v_count vertices if
+            there is a cycle, and levels is None unless asked for.
+        """
+        n = self.v_count
+        offsets, targets, _ = self._scan_csr()
+        indegree = array('i', [0]) * n
+        for dst in targets:
+            indegree[dst] += 1
+
+        # order doubles as the queue. Everything queued while working through one level makes up the next one.
+        dead = self._dead
+        order = array('i', [v for v in range(n) if indegree[v] == 0 and (dead is None or not dead[v])])
+        depths = array('i', [0]) * len(order) if levels else None
+        start, depth = 0, 0
+        while start < len(order):
+            end = len(order)
+            depth += 1
+            for i in range(start, end):
+                vertex = order[i]
+                for edge in range(offsets[vertex], offsets[vertex + 1]):
+                    dst = targets[edge]
+                    indegree[dst] -= 1
+                    if indegree[dst] == 0:
+                        order.append(dst)
+            if levels:
+                depths.extend(array('i', [depth]) * (len(order) - end))
+            start = end
+        return order, depths
+
+    def dag_shortest_paths(self, src: int) -> ():
+        """
+        Returns (distances, predecessors) like shortest_paths(). On an acyclic graph the edges get relaxed once each in
+            topological order, which is O(V + E) with no heap, and on a cyclic one this just runs dijkstra.
+        """
+        if not self._is_live(src):
+            return [float('inf')] * self.v_count, [-1] * self.v_count
+        if self._topo is not None and self._topo.cyclic:
+            return self.shortest_paths(src)
+        order, _ = self._kahn()
+        if len(order) < self.v_count - self.dead_count:
+            return self.shortest_paths(src)
+        return self._relax_in_order(order, src, False)
+
+    def dag_longest_paths(self, src: int) -> ():
+        """
+        Returns (distances, predecessors) for the longest (heaviest) paths from src, -inf for vertices it can't reach.
+            Following the predecessors back from the farthest vertex gives the critical path. Longest paths only make
+            sense without cycles, so a cyclic graph gets two empty lists.
+        """
+        if not self._is_live(src):
+            return [float('-inf')] * self.v_count, [-1] * self.v_count
+        order, _ = self._kahn()
+        if len(order) < self.v_count - self.dead_count:
+            return [], []
+        return self._relax_in_order(order, src, True)
+
+    def _relax_in_order(self, order: array, src: int, longest: bool) -> ():
+        """
+        Relaxes every edge out of the vertices that come after src in a topological order, keeping the shorter (or
+            with longest=True, the longer) distance each time.
+        """
+        offsets, targets, weights = self._storage.to_csr()
+        unreached = float('-inf') if longest else float('inf')
+        distances = [unreached] * self.v_count
+        predecessors = [-1] * self.v_count
+        distances[src] = 0
+        for i in range(order.index(src), len(order)):
+            vertex = order[i]
+            distance = distances[vertex]
+            if distance == unreached:
+                continue
+
+            # Two copies of the loop so the comparison doesn't cost a function call per edge
+            if longest:
+                for edge in range(offsets[vertex], offsets[vertex + 1]):
+                    dst = targets[edge]
+                    if distance + weights[edge] > distances[dst]:
+                        distances[dst] = distance + weights[edge]
+                        predecessors[dst] = vertex
+            else:
+                for edge in range(offsets[vertex], offsets[vertex + 1]):
+                    dst = targets[edge]
+                    if distance + weights[edge] < distances[dst]:
+                        distances[dst] = distance + weights[edge]
+                        predecessors[dst] = vertex
+        return distances, predecessors
 
     """
     MY CODE ENDS HERE!
     """
 
 
+class SparseDirectedGraph(DirectedGraph):
+    """
+    DirectedGraph stored as compressed sparse rows instead of a dense matrix. Memory is O(V + E), so this is the one to
+    use for big graphs with few edges per vertex.
+    """
+    storage_class = SparseStorage
+
+
 if __name__ == '__main__':
 
     print("\nPDF - method add_vertex() / add_edge example 1")
@@ -382,3 +2372,156 @@ if __name__ == '__main__':
     print('\n', g)
     for i in range(5):
         print(f'DIJKSTRA {i} {g.dijkstra(i)}')
+
+    print("\nmulti_source_dijkstra() on a graph without edges")
+    print("-------------------------------------------------")
+    g = DirectedGraph()
+    for _ in range(3):
+        g.add_vertex()
+    for src, distances in sorted(g.multi_source_dijkstra([0, 1, 2], processes=2)):
+        print(src, list(distances))
+
+    print("\nvertices() / edges() / neighbors() views")
+    print("----------------------------------------")
+    g = DirectedGraph([(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3)])
+    vertices, edges = g.vertices(), g.edges()
+    print(len(vertices), len(edges), 3 in vertices, (4, 3) in edges, (4, 3, 99) in edges)
+    print(sorted(vertices & {0, 1, 9}), sorted(edges - {(0, 1, 10)}))
+    print(dict(g.neighbors(4)), len(g.neighbors(4)), g.neighbors(4).get(0), g.neighbors(4).get('x'))
+    g.add_edge(3, 2, 7)
+    print(len(edges), (3, 2) in edges, sorted(vertices | {9}))
+    print(1.5 in vertices, (1.5, 2) in edges, 1.5 in g.neighbors(4))
+
+    print("\nremove_vertex() / compact() example")
+    print("-----------------------------------")
+    for graph_class in (DirectedGraph, SparseDirectedGraph):
+        g = graph_class([(0, 1, 1), (1, 2, 1), (2, 3, 1), (3, 0, 1)])
+        g.remove_vertex(2)
+        g.add_edge(1, 2, 5)
+        g.add_edges_from([(1, 2, 5), (2, 3, 5), (1, 3, 4)])
+        print(g.get_vertices(), g.get_edges(), g.dfs(0), g.dijkstra(2))
+        mapping = g.compact()
+        print(list(mapping), g.get_vertices(), g.get_edges())
+
+    print("\nsave() / load() after remove_vertex()")
+    print("-------------------------------------")
+    import os
+    import tempfile
+    g = SparseDirectedGraph([(0, 1, 10), (1, 2, 15), (2, 0, 12)])
+    g.remove_vertex(1)
+    path = os.path.join(tempfile.mkdtemp(), 'graph.dg')
+    g.save(path)
+    for mmap in (True, False):
+        loaded = SparseDirectedGraph.load(path, mmap)
+        print(g.get_vertices(), loaded.get_vertices(), loaded.get_edges(), loaded.dfs(1))
+        del loaded
+    os.remove(path)
+
+    print("\nadj_matrix writes keep the caches up to date")
+    print("--------------------------------------------")
+    g = DirectedGraph([(0, 1, 1), (1, 2, 1)])
+    g.enable_path_cache()
+    print(g.dijkstra(0), g.can_reach(2, 0))
+    g.adj_matrix[0][2] = 1
+    g.adj_matrix[2][0] = 1
+    print(g.dijkstra(0), g.can_reach(2, 0), g.has_cycle())
+
+    print("\nShortestPathCache stays under max_bytes")
+    print("---------------------------------------")
+    g = SparseDirectedGraph([(v, v + 1, 1.5) for v in range(999)])
+    cache = g.enable_path_cache(max_bytes=100 * 1024)
+    for src in range(0, 1000, 100):
+        g.dijkstra(src)
+    print(len(cache), cache.bytes <= cache.max_bytes, cache.stats()['evictions'])
+
+    print("\ntry_add_edge() example")
+    print("----------------------")
+    g = DirectedGraph([(0, 1, 1), (1, 2, 1)])
+    for src, dst, weight in [(0, 2, 1), (2, 0, 1), (2, 1, 0), (1, 1, 1)]:
+        print(src, dst, weight, g.try_add_edge(src, dst, weight))
+
+    print("\ntrack_cycles(reject=True) with bulk adds")
+    print("----------------------------------------")
+    for graph_class in (DirectedGraph, SparseDirectedGraph):
+        g = graph_class([(0, 1, 1), (1, 2, 1)])
+        g.track_cycles(reject=True)
+        g.add_edge(2, 0)
+        g.add_edges_from([(2, 0, 1), (2, 3, 1), (3, 1, 1), (0, 3, 2)])
+        g.add_edge_arrays([3], [0])
+        print(g.get_edges(), g.has_cycle())
+
+    print("\niter_dfs() / iter_bfs() / shortest_paths() example")
+    print("--------------------------------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    for graph_class in (DirectedGraph, SparseDirectedGraph):
+        g = graph_class(edges)
+        print(list(g.iter_dfs(0)), list(g.iter_bfs(0, 3)), g.shortest_path(0, 2), g.shortest_paths(0))
+
+    print("\nadd_edge_arrays() / from_edge_array() example")
+    print("---------------------------------------------")
+    g = SparseDirectedGraph.from_edge_array([0, 4, 1, 4], [1, 0, 4, 3], [10, 12, 15, 3])
+    g.add_edge_arrays([3, 2, 3, 3], [1, 1, 2, 3], [5, 23, 7, 1])
+    print(g.get_edges())
+
+    print("\nastar() with and without landmarks")
+    print("----------------------------------")
+    g = SparseDirectedGraph(edges)
+    print(g.astar(0, 2), g.astar(2, 0), g.astar(0, 9))
+    g.prepare_landmarks(count=2)
+    print(g.astar(0, 2), g.astar(2, 0))
+    g.add_edge(0, 2, 1)
+    print(g.astar(0, 2))
+
+    print("\nstrongly_connected_components() / condensation() / can_reach() example")
+    print("----------------------------------------------------------------------")
+    g = SparseDirectedGraph([(0, 1, 1), (1, 0, 1), (1, 2, 4), (2, 3, 1), (3, 2, 1), (4, 3, 2)])
+    condensed = g.condensation()
+    print(list(g.strongly_connected_components()), condensed.dag.get_edges())
+    print(g.can_reach(0, 3), g.can_reach(3, 0), g.can_reach(4, 2), g.can_reach(2, 4))
+
+    print("\ntopological_order() / dag_shortest_paths() / dag_longest_paths() example")
+    print("------------------------------------------------------------------------")
+    g = DirectedGraph([(0, 1, 2), (1, 2, 3), (0, 2, 9), (2, 3, 1), (0, 4, 1)])
+    order, levels = g.topological_order(levels=True)
+    print(list(order), list(levels), g.dag_shortest_paths(0), g.dag_longest_paths(0))
+    g.add_edge(3, 0, 1)
+    print(list(g.topological_order()), g.dag_shortest_paths(0))
+
+    print("\nsnapshot() example")
+    print("------------------")
+    for graph_class in (DirectedGraph, SparseDirectedGraph):
+        g = graph_class([(0, 1, 2), (1, 2, 3)])
+        frozen = g.snapshot()
+        g.add_edge(2, 0, 1)
+        print(frozen.get_edges(), frozen.has_cycle(), g.get_edges(), g.has_cycle())
+        try:
+            frozen.add_edge(0, 2)
+        except TypeError as error:
+            print(error)
+
+    print("\nvalidate_paths() example")
+    print("------------------------")
+    g = SparseDirectedGraph(edges)
+    valid, first_invalid = g.validate_paths([[0, 1, 4, 3], [1, 3, 2, 1], [0, 4], [4, 0], [], [2], [7]])
+    print([bool(x) for x in valid], [int(x) for x in first_invalid])
+
+    print("\ninstrument() example")
+    print("--------------------")
+    g = SparseDirectedGraph(edges)
+    metrics = g.instrument()
+    g.dijkstra(0)
+    g.bfs(0)
+    g.bfs(2)
+    print({name: (stats['calls'], stats['pops']) for name, stats in metrics.as_dict().items()})
+    g.uninstrument()
+
+    print("\nfloyd_warshall() / transitive_closure() example")
+    print("-----------------------------------------------")
+    if np is None:
+        print('needs NumPy')
+    else:
+        g = DirectedGraph([(0, 1, 2), (1, 2, 3), (0, 2, 9), (2, 3, 1)])
+        distances, next_hop = g.floyd_warshall()
+        print(distances[0].tolist(), g.next_hop_path(next_hop, 0, 3), g.next_hop_path(next_hop, 3, 0))
+        print(g.transitive_closure().astype(int).tolist())
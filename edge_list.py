@@ -0,0 +1,171 @@
+# Course: CS261 - Data Structures
+# Description: Streams edge-list files ("src dst [weight]" per line, whitespace or CSV, optionally gzipped) into a
+#   DirectedGraph or UndirectedGraph a chunk at a time, so big files never have to sit in memory all at once.
+
+import gzip
+import io
+import os
+from array import array
+
+from d_graph import DirectedGraph
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def read_edge_list(path, graph, chunk_size: int = 4 * 1024 * 1024, delimiter: str = None, comment: str = '#',
+                   on_error=None, progress=None):
+    """
+    Reads an edge-list file into graph and returns the graph.
+    - every line is 'src dst' or 'src dst weight', split on whitespace or on delimiter (',' for CSV)
+    - DirectedGraph files need non-negative integer ids, UndirectedGraph files can use any names and weights are ignored
+    - blank lines and lines starting with comment are skipped, gzip files are recognised by their header
+    - the file is read about chunk_size bytes at a time
+    - a bad line raises ValueError with its line number, unless on_error is given, then on_error(line_no, line,
+      message) gets called and the line is skipped
+    - progress(lines_read, bytes_read, total_bytes) is called after every chunk (bytes are counted on disk, so gzip
+      files report compressed bytes)
+    """
+    directed = isinstance(graph, DirectedGraph)
+    total = os.path.getsize(path)
+    pending = _EdgeBuffer()
+    loaded = 0
+
+    with open(path, 'rb') as raw:
+        stream = gzip.GzipFile(fileobj=raw) if raw.peek(2)[:2] == b'\x1f\x8b' else raw
+        text = io.TextIOWrapper(stream, encoding='utf-8')
+        line_no = 0
+        while True:
+            lines = text.readlines(chunk_size)
+            if not lines:
+                break
+            edges = _parse_lines(lines, line_no + 1, directed, delimiter, comment, on_error, path)
+            line_no += len(lines)
+
+            if not directed:
+                graph.add_edges_from(zip(edges[0], edges[1]))
+            else:
+                # Sparse graphs rebuild their CSR arrays on every bulk load, so edges get held back until there are
+                #   about as many new ones as the graph already has. That keeps the total rebuild work linear.
+                pending.extend(*edges)
+                if len(pending) >= max(loaded, 1 << 16):
+                    loaded += len(pending)
+                    pending.flush(graph)
+
+            if progress is not None:
+                progress(line_no, raw.tell(), total)
+
+    pending.flush(graph)
+    return graph
+
+
+class _EdgeBuffer:
+    """
+    Edges parsed for a DirectedGraph that haven't been handed to it yet, kept in compact arrays.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def extend(self, src, dst, weights) -> None:
+        if len(src):
+            self.parts.append((src, dst, weights))
+            self.size += len(src)
+
+    def flush(self, graph) -> None:
+        if not self.parts:
+            return
+        if np is not None:
+            src, dst, weights = (np.concatenate(column) for column in zip(*self.parts))
+        else:
+            src, dst, weights = array('q'), array('q'), []
+            for part in self.parts:
+                src.extend(part[0])
+                dst.extend(part[1])
+                weights.extend(part[2])
+        graph.add_edge_arrays(src, dst, weights)
+        self.parts = []
+        self.size = 0
+
+
+def _parse_lines(lines: [], first_line: int, directed: bool, delimiter, comment, on_error, path) -> ():
+    """
+    Turns a chunk of lines into (src, dst, weights) columns.
+    """
+    if delimiter is None:
+        fields = [line.split() for line in lines]
+    else:
+        fields = [[field.strip() for field in line.rstrip('\r\n').split(delimiter)] for line in lines]
+        fields = [row if row != [''] else [] for row in fields]
+
+    # Fast path: a chunk of clean numeric lines gets converted by NumPy in one go. If anything in it is off, the slow
+    #   path below goes through it line by line to find out where.
+    if directed and np is not None:
+        rows = [row for row in fields if row and not row[0].startswith(comment)]
+        widths = {len(row) for row in rows}
+        if rows and (widths == {2} or widths == {3}):
+            try:
+                return _parse_numeric(np.array(rows))
+            except ValueError:
+                pass
+
+    src, dst, weights = [], [], []
+    for offset, row in enumerate(fields):
+        if not row or row[0].startswith(comment):
+            continue
+        try:
+            if len(row) not in (2, 3):
+                raise ValueError(f'expected 2 or 3 columns, got {len(row)}')
+            if directed:
+                u, v = int(row[0]), int(row[1])
+                if u < 0 or v < 0:
+                    raise ValueError('vertex ids must be non-negative integers')
+                weight = _number(row[2]) if len(row) == 3 else 1
+            else:
+                u, v, weight = row[0], row[1], None
+        except ValueError as error:
+            line = lines[offset].rstrip('\r\n')
+            if on_error is None:
+                raise ValueError(f'{path}, line {first_line + offset}: {error}: {line!r}') from None
+            on_error(first_line + offset, line, str(error))
+            continue
+        src.append(u)
+        dst.append(v)
+        weights.append(weight)
+
+    if directed:
+        return array('q', src), array('q', dst), weights
+    return src, dst, weights
+
+
+def _parse_numeric(table) -> ():
+    """
+    Vectorized parse of an (n, 2) or (n, 3) array of strings. Raises ValueError if anything doesn't parse.
+    """
+    ids = table[:, :2].astype(np.int64)
+    if (ids < 0).any():
+        raise ValueError('negative vertex id')
+    if table.shape[1] == 2:
+        weights = np.ones(len(table), dtype=np.int64)
+    else:
+        try:
+            weights = table[:, 2].astype(np.int64)
+        except ValueError:
+            weights = table[:, 2].astype(np.float64)
+    return ids[:, 0], ids[:, 1], weights
+
+
+def _number(text: str):
+    """
+    Parses a weight, keeping whole numbers as ints.
+    """
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
@@ -0,0 +1,105 @@
+# Course: CS261 - Data Structures
+# Description: Seeded random graph generators for testing and benchmarking. Every generator returns a list of
+#   (src, dst, weight) edges over vertices 0..n-1 and gives the same graph back for the same seed.
+
+import random
+
+
+def erdos_renyi(n: int, avg_degree: float = 4, seed: int = 0, max_weight: int = 10) -> []:
+    """
+    Random graph with about n * avg_degree distinct directed edges, every pair equally likely.
+    """
+    rng = random.Random(seed)
+    target = min(int(n * avg_degree), n * (n - 1))
+    seen = set()
+    edges = []
+    while len(edges) < target:
+        u, v = rng.randrange(n), rng.randrange(n)
+        if u != v and (u, v) not in seen:
+            seen.add((u, v))
+            edges.append((u, v, rng.randint(1, max_weight)))
+    return edges
+
+
+def grid(n: int, seed: int = 0, max_weight: int = 10) -> []:
+    """
+    Square-ish grid with about n vertices, every cell linked both ways to the cells right of and below it.
+    """
+    rng = random.Random(seed)
+    cols = max(1, int(n ** 0.5))
+    rows = max(1, n // cols)
+    edges = []
+    for r in range(rows):
+        for c in range(cols):
+            v = r * cols + c
+            if c + 1 < cols:
+                edges.append((v, v + 1, rng.randint(1, max_weight)))
+                edges.append((v + 1, v, rng.randint(1, max_weight)))
+            if r + 1 < rows:
+                edges.append((v, v + cols, rng.randint(1, max_weight)))
+                edges.append((v + cols, v, rng.randint(1, max_weight)))
+    return edges
+
+
+def preferential_attachment(n: int, m: int = 2, seed: int = 0, max_weight: int = 10) -> []:
+    """
+    Barabasi-Albert style power-law graph. Each new vertex links to m earlier vertices, picked with probability
+        proportional to their degree, so a few hubs end up with most of the edges.
+    """
+    rng = random.Random(seed)
+
+    # Every edge endpoint goes into this list once, so picking uniformly from it is picking by degree
+    endpoints = list(range(min(m, n)))
+    edges = []
+    for v in range(m, n):
+        targets = set()
+        while len(targets) < m:
+            targets.add(rng.choice(endpoints))
+        for u in targets:
+            edges.append((v, u, rng.randint(1, max_weight)))
+            endpoints.append(u)
+            endpoints.append(v)
+    return edges
+
+
+def chain(n: int, seed: int = 0, max_weight: int = 10) -> []:
+    """
+    One long path 0 -> 1 -> ... -> n-1. The worst case for anything recursive.
+    """
+    rng = random.Random(seed)
+    return [(v, v + 1, rng.randint(1, max_weight)) for v in range(n - 1)]
+
+
+def random_dag(n: int, avg_degree: float = 4, seed: int = 0, max_weight: int = 10) -> []:
+    """
+    Random acyclic graph, every edge goes from a lower vertex number to a higher one.
+    """
+    rng = random.Random(seed)
+    target = min(int(n * avg_degree), n * (n - 1) // 2)
+    seen = set()
+    edges = []
+    while len(edges) < target:
+        u, v = rng.randrange(n), rng.randrange(n)
+        if u == v:
+            continue
+        u, v = min(u, v), max(u, v)
+        if (u, v) not in seen:
+            seen.add((u, v))
+            edges.append((u, v, rng.randint(1, max_weight)))
+    return edges
+
+
+def undirected_pairs(edges: []) -> []:
+    """
+    Turns generated edges into (name, name) pairs for an UndirectedGraph, dropping weights and direction.
+    """
+    return [(f'v{u}', f'v{v}') for u, v, _ in edges]
+
+
+GENERATORS = {
+    'erdos_renyi': erdos_renyi,
+    'grid': grid,
+    'preferential_attachment': preferential_attachment,
+    'chain': chain,
+    'random_dag': random_dag,
+}
@@ -0,0 +1,136 @@
+# Course: CS261 - Data Structures
+# Description: Opt-in instrumentation for DirectedGraph and UndirectedGraph. graph.instrument() swaps the searches on
+#   that one graph object for wrappers that count the work they do, so graphs that never call it run the plain methods
+#   with no extra cost at all.
+
+from time import perf_counter
+
+
+class Probe:
+    """
+    Counters for a single instrumented call.
+    - vertices: vertices whose neighbors got looked at
+    - edges: edges scanned (relaxed, for the shortest path searches)
+    - pushes / pops: priority queue operations of the shortest path searches
+    """
+    __slots__ = ('vertices', 'edges', 'pushes', 'pops')
+
+    def __init__(self):
+        self.vertices = 0
+        self.edges = 0
+        self.pushes = 0
+        self.pops = 0
+
+
+class OperationStats:
+    """
+    Running totals for one method, summed over every call to it.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.vertices = 0
+        self.edges = 0
+        self.pushes = 0
+        self.pops = 0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+    def __repr__(self) -> str:
+        return f'OperationStats({self.as_dict()})'
+
+
+class GraphMetrics:
+    """
+    Collects OperationStats per method name, and passes every call on to the callbacks as it finishes. A callback is
+        called as callback(graph, operation, sample), where sample is a dict with the seconds and counters of that one
+        call, which is what an exporter (Prometheus style counters and histograms) wants to see.
+    One GraphMetrics can be shared by several graphs.
+    """
+
+    def __init__(self, callbacks=()):
+        self.operations = {}
+        self.callbacks = list(callbacks)
+
+    def __getitem__(self, operation: str) -> OperationStats:
+        return self.operations[operation]
+
+    def add_callback(self, callback) -> None:
+        self.callbacks.append(callback)
+
+    def remove_callback(self, callback) -> None:
+        self.callbacks.remove(callback)
+
+    def record(self, graph, operation: str, seconds: float, probe: Probe) -> None:
+        stats = self.operations.get(operation)
+        if stats is None:
+            stats = self.operations[operation] = OperationStats()
+        stats.calls += 1
+        stats.seconds += seconds
+        stats.vertices += probe.vertices
+        stats.edges += probe.edges
+        stats.pushes += probe.pushes
+        stats.pops += probe.pops
+
+        if self.callbacks:
+            sample = {'seconds': seconds, 'vertices': probe.vertices, 'edges': probe.edges, 'pushes': probe.pushes,
+                      'pops': probe.pops}
+            for callback in self.callbacks:
+                callback(graph, operation, sample)
+
+    def reset(self) -> None:
+        self.operations.clear()
+
+    def as_dict(self) -> dict:
+        return {operation: stats.as_dict() for operation, stats in self.operations.items()}
+
+
+def instrument(graph, operations: (), metrics: GraphMetrics = None) -> GraphMetrics:
+    """
+    Wraps the given methods on this one graph object (not its class) so every call gets counted into metrics.
+        graph._start_counting(probe) has to point the graph's internals at the probe and return a function that
+        undoes that.
+    """
+    uninstrument(graph, operations)
+    if metrics is None:
+        metrics = GraphMetrics()
+    graph.metrics = metrics
+    graph._probe = None
+    for operation in operations:
+        setattr(graph, operation, _wrap(graph, operation, getattr(graph, operation), metrics))
+    return metrics
+
+
+def uninstrument(graph, operations: ()) -> None:
+    """
+    Drops the wrappers again, so the graph goes back to the plain class methods.
+    """
+    for operation in operations:
+        graph.__dict__.pop(operation, None)
+    graph.__dict__.pop('metrics', None)
+    graph.__dict__.pop('_probe', None)
+
+
+def _wrap(graph, operation: str, method, metrics: GraphMetrics):
+    def wrapper(*args, **kwargs):
+        # Calls made from inside another instrumented call (shortest_path() runs dijkstra, and so on) are already
+        #   being counted by the outer one
+        if graph._probe is not None:
+            return method(*args, **kwargs)
+
+        probe = graph._probe = Probe()
+        restore = graph._start_counting(probe)
+        start = perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            seconds = perf_counter() - start
+            restore()
+            graph._probe = None
+            metrics.record(graph, operation, seconds, probe)
+
+    wrapper.__name__ = operation
+    wrapper.__doc__ = method.__doc__
+    return wrapper
@@ -0,0 +1,22 @@
+# Course: CS261 - Data Structures
+# Description: Base class for the live set-like views DirectedGraph and UndirectedGraph hand out from vertices() and
+#   edges().
+
+from collections.abc import Set
+
+
+class SetView(Set):
+    """
+    Live set-like view of some part of a graph. The subclasses only need __len__, __iter__ and __contains__, the Set
+    mixins add the comparisons and the set operators on top of those.
+    """
+    __slots__ = ('_graph',)
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    @classmethod
+    def _from_iterable(cls, it) -> set:
+        # Set operators build their result through this, and a plain set is what they should give back, not another
+        #   view (which couldn't be built from an iterable anyway)
+        return set(it)
@@ -0,0 +1,102 @@
+# Course: CS261 - Data Structures
+# Description: Batch path checking shared by DirectedGraph.validate_paths() and UndirectedGraph.validate_paths(). All
+#   the paths go in as one flat array of vertex ids plus offsets, and every hop of every path gets binary searched in
+#   the graph's sorted CSR rows in one vectorized pass. Without NumPy it falls back to checking one hop at a time.
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def split_paths(paths, offsets=None) -> ():
+    """
+    Returns (flat, offsets) for a list of paths, where path k is flat[offsets[k]:offsets[k + 1]]. Paths that already
+        come as a flat sequence plus offsets are passed through as they are.
+    """
+    if offsets is not None:
+        return paths, offsets
+    flat, offsets = [], [0]
+    for path in paths:
+        flat.extend(path)
+        offsets.append(len(flat))
+    return flat, offsets
+
+
+def csr_index(offsets, targets) -> ():
+    """
+    Copies CSR arrays into the (offsets, targets) int64 NumPy arrays check_paths() searches. They're copies, since a
+        NumPy view would stop the graph from growing its own arrays.
+    """
+    return np.array(offsets, dtype=np.int64), np.array(targets, dtype=np.int64)
+
+
+def check_paths(ids, offsets, known, index) -> ():
+    """
+    Vectorized check of every path at once.
+    - ids is the flat int64 array of vertex ids, known[j] says whether ids[j] is a vertex of the graph at all
+    - index is the graph as (offsets, targets) CSR arrays from csr_index(), with every row sorted
+    Returns (valid, first_invalid) NumPy arrays, first_invalid[k] being the position in path k of the first vertex that
+        is unknown or can't be reached from the one before it, and -1 if path k is valid.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    count = len(offsets) - 1
+    bad = ~known
+
+    if len(ids) > 1:
+        # Hop j goes from ids[j] to ids[j + 1]. Hops with an unknown end are already bad, and the step from the last
+        #   vertex of one path onto the first of the next isn't a hop at all.
+        starts = np.zeros(len(ids), dtype=bool)
+        starts[offsets[:-1][offsets[:-1] < len(ids)]] = True
+        hops = np.flatnonzero(known[:-1] & known[1:] & ~starts[1:])
+        bad[hops + 1] = ~_has_edges(index, ids[hops], ids[hops + 1])
+
+    # The first bad position inside each path. Bad positions come out sorted, so np.unique finds the first one of
+    #   every path that has any.
+    first_invalid = np.full(count, -1, dtype=np.int64)
+    positions = np.flatnonzero(bad)
+    if len(positions):
+        owners = np.searchsorted(offsets, positions, side='right') - 1
+        owners, first = np.unique(owners, return_index=True)
+        first_invalid[owners] = positions[first] - offsets[owners]
+    return first_invalid == -1, first_invalid
+
+
+def _has_edges(index, src, dst):
+    """
+    Binary searches for every dst in its own src row, all hops side by side. Rows are short, so that takes a handful
+        of rounds, and each round only keeps the searches that haven't narrowed down to one slot yet.
+    """
+    row_offsets, targets = index
+    if len(targets) == 0:
+        return np.zeros(len(src), dtype=bool)
+
+    lo, hi = row_offsets[src], row_offsets[src + 1]
+    low, high, wanted, active = lo.copy(), hi, dst, np.arange(len(src))
+    while len(active):
+        middle = (low + high) >> 1
+        right = targets[np.minimum(middle, len(targets) - 1)] < wanted
+        low = np.where(right, middle + 1, low)
+        high = np.where(right, high, middle)
+        lo[active] = low
+        keep = low < high
+        active, low, high, wanted = active[keep], low[keep], high[keep], wanted[keep]
+
+    return (lo < hi) & (targets[np.minimum(lo, len(targets) - 1)] == dst)
+
+
+def check_paths_python(flat, offsets, is_vertex, has_edge) -> ():
+    """
+    One hop at a time version of check_paths() for when NumPy isn't there. Returns the same two results as lists.
+    """
+    valid, first_invalid = [], []
+    for k in range(len(offsets) - 1):
+        start, end = offsets[k], offsets[k + 1]
+        bad = -1
+        for j in range(start, end):
+            if not is_vertex(flat[j]) or (j > start and not has_edge(flat[j - 1], flat[j])):
+                bad = j - start
+                break
+        valid.append(bad == -1)
+        first_invalid.append(bad)
+    return valid, first_invalid
@@ -4,6 +4,466 @@
 # Description: Creates functionality for an undirected graph, including the ability to add/remove edges/nodes and
 #   search through the graph in different ways.
 
+import mmap as mmap_module
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from collections.abc import Mapping
+from itertools import chain
+
+from graph_metrics import GraphMetrics, instrument, uninstrument
+from graph_views import SetView
+from path_validation import check_paths, check_paths_python, csr_index, split_paths
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Rows with this many neighbors switch from a sorted array to a dict the next time they are edited. Below it an insert
+#   or delete only shifts a few entries, above it the dict keeps every edit O(1) no matter how big the row gets.
+HOT_ROW_SIZE = 64
+
+
+def _has(row, i: int) -> bool:
+    """
+    Checks for vertex id i in a row: a hash lookup in a dict row, a binary search in a sorted array one.
+    """
+    if type(row) is dict:
+        return i in row
+    index = bisect_left(row, i)
+    return index < len(row) and row[index] == i
+
+
+def _sorted_row(row):
+    """
+    Returns the row as a sorted sequence of ids. Array rows already are one.
+    """
+    return array('i', sorted(row)) if type(row) is dict else row
+
+
+def _above(row, i: int):
+    """
+    The neighbors in a row with ids bigger than i. Listing those for every vertex lists every edge once.
+    """
+    if type(row) is dict:
+        return [j for j in row if j > i]
+    return row[bisect_right(row, i):]
+
+
+class _NeighborView:
+    """
+    Live read-only view of one vertex's neighbors as names, in the order their edges were added. len() is O(1) and
+    'in' is a binary search. Prints like a list so the graph output looks the same as before.
+    """
+    __slots__ = ('_graph', '_v')
+
+    def __init__(self, graph, v):
+        self._graph = graph
+        self._v = v
+
+    def _row(self, rows: []):
+        # Looked up on every call, since edits can swap the row out (or renumber the vertex)
+        i = self._graph._ids.get(self._v)
+        return () if i is None else rows[i]
+
+    def __contains__(self, v) -> bool:
+        i = self._graph._ids.get(v)
+        return i is not None and _has(self._row(self._graph._rows), i)
+
+    def __iter__(self):
+        names = self._graph._names
+        return (names[i] for i in self._row(self._graph._order))
+
+    def __len__(self) -> int:
+        return len(self._row(self._graph._rows))
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class _AdjacencyView(Mapping):
+    """
+    Read-only view of the whole graph as the old name -> neighbors dict, in the order the vertices were added.
+    """
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __getitem__(self, v) -> _NeighborView:
+        if v not in self._graph._ids:
+            raise KeyError(v)
+        return _NeighborView(self._graph, v)
+
+    def __contains__(self, v) -> bool:
+        return v in self._graph._ids
+
+    def __iter__(self):
+        names, rows = self._graph._names, self._graph._rows
+        return (names[i] for i in range(len(rows)) if rows[i] is not None)
+
+    def __len__(self) -> int:
+        return len(self._graph._ids)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class _VerticesView(SetView):
+    """
+    Live view of the vertex names of an UndirectedGraph. len() and 'in' are O(1).
+    """
+    __slots__ = ()
+
+    def __len__(self) -> int:
+        return len(self._graph._ids)
+
+    def __iter__(self):
+        names, rows = self._graph._names, self._graph._rows
+        return (names[i] for i in range(len(rows)) if rows[i] is not None)
+
+    def __contains__(self, v) -> bool:
+        try:
+            return v in self._graph._ids
+        except TypeError:
+            return False
+
+    def __repr__(self) -> str:
+        return f'vertices({list(self)})'
+
+
+class _EdgesView(SetView):
+    """
+    Live view of the edges of an UndirectedGraph as (u, v) pairs, each edge once, streamed without building a list.
+        len() is O(1) from the graph's edge counter, and 'in' takes the pair either way around.
+    """
+    __slots__ = ()
+
+    def __len__(self) -> int:
+        return self._graph._edge_count
+
+    def __iter__(self):
+        # Same order as get_edges(), every edge listed from its vertex with the smaller id
+        names, rows = self._graph._names, self._graph._rows
+        for i in range(len(rows)):
+            row = rows[i]
+            if row is not None:
+                name = names[i]
+                for j in _above(row, i):
+                    yield name, names[j]
+
+    def __contains__(self, edge) -> bool:
+        if not isinstance(edge, tuple) or len(edge) != 2:
+            return False
+        ids = self._graph._ids
+        try:
+            i, j = ids.get(edge[0]), ids.get(edge[1])
+        except TypeError:
+            return False
+        return i is not None and j is not None and _has(self._graph._rows[i], j)
+
+    def __repr__(self) -> str:
+        return f'edges({list(self)})'
+
+
+class ComponentIndex:
+    """
+    Union-find over the vertex ids of an UndirectedGraph, kept up to date as the graph changes.
+    - adding vertices and edges just merges sets
+    - removing an edge or vertex might split a component, so its set only gets marked dirty
+    - dirty sets get rebuilt (with a BFS over just their own members) the next time someone asks a question
+    """
+
+    def __init__(self):
+        self.parent = array('i')
+        self.members = {}
+        self.count = 0
+        self.dirty = set()
+
+    @classmethod
+    def unknown(cls, v_count: int):
+        """
+        Index for a graph whose components haven't been worked out yet. Everything starts out in one dirty set under
+            vertex 0, so the first question about components does the full rebuild.
+        """
+        index = cls()
+        if v_count:
+            index.parent = array('i', bytes(4 * v_count))
+            index.members[0] = array('i', range(v_count))
+            index.count = 1
+            index.dirty.add(0)
+        return index
+
+    def find(self, v: int) -> int:
+        # Path halving keeps the trees flat
+        parent = self.parent
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    def add_vertex(self, v: int) -> None:
+        # Ids are handed out in order and never reused, so a new vertex is always the next one
+        self.parent.append(v)
+        self.members[v] = array('i', [v])
+        self.count += 1
+
+    def union(self, u, v) -> None:
+        root_u, root_v = self.find(u), self.find(v)
+        if root_u == root_v:
+            return
+
+        # Smaller set goes under the bigger one, and a dirty flag moves along with it
+        if len(self.members[root_u]) < len(self.members[root_v]):
+            root_u, root_v = root_v, root_u
+        self.parent[root_v] = root_u
+        self.members[root_u].extend(self.members.pop(root_v))
+        self.count -= 1
+        if root_v in self.dirty:
+            self.dirty.discard(root_v)
+            self.dirty.add(root_u)
+
+    def mark_dirty(self, v) -> None:
+        self.dirty.add(self.find(v))
+
+    def flush(self, rows: []) -> None:
+        """
+        Rebuilds every dirty set from the current adjacency rows (None for removed vertices). Only the members of those
+            sets get looked at.
+        """
+        for root in self.dirty:
+            members = self.members.pop(root)
+            self.count -= 1
+
+            # Dropping vertices that were removed from the graph since the set was built
+            alive = [v for v in members if rows[v] is not None]
+
+            # Every edge of an alive member stays inside this set, so a BFS from each unseen member finds the pieces
+            seen = set()
+            for start in alive:
+                if start in seen:
+                    continue
+                seen.add(start)
+                component = [start]
+                index = 0
+                while index < len(component):
+                    for vertex in rows[component[index]]:
+                        if vertex not in seen:
+                            seen.add(vertex)
+                            component.append(vertex)
+                    index += 1
+
+                for vertex in component:
+                    self.parent[vertex] = start
+                self.members[start] = array('i', component)
+                self.count += 1
+
+        self.dirty.clear()
+
+
+class _CountingRow:
+    """
+    Wraps one adjacency row while an instrumented call runs. Going through the row counts as visiting the vertex and
+        scanning each of its edges.
+    """
+    __slots__ = ('_row', '_probe')
+
+    def __init__(self, row, probe):
+        self._row = row
+        self._probe = probe
+
+    def __iter__(self):
+        probe = self._probe
+        probe.vertices += 1
+        for i in self._row:
+            probe.edges += 1
+            yield i
+
+    def __getitem__(self, index):
+        return self._row[index]
+
+    def __len__(self) -> int:
+        return len(self._row)
+
+
+class _CountingRows:
+    """
+    Stands in for the list of adjacency rows while an instrumented call runs, handing out counting rows.
+    """
+
+    def __init__(self, rows: [], probe):
+        self._rows = rows
+        self._probe = probe
+
+    def __getitem__(self, i):
+        row = self._rows[i]
+        return None if row is None else _CountingRow(row, self._probe)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+class _MappedRows:
+    """
+    The adjacency rows (or insertion-order rows) of a graph loaded with mmap=True. Rows get sliced out of the mapped
+        CSR arrays when they are asked for, so loading doesn't build anything per vertex. Rows that get replaced (by
+        an edit, or with None when their vertex is removed) and rows of vertices added after loading are kept on the
+        side in _changed.
+    """
+    __slots__ = ('_offsets', '_targets', '_length', '_changed')
+
+    def __init__(self, offsets, targets, length: int):
+        self._offsets = offsets
+        self._targets = targets
+        self._length = length
+        self._changed = {}
+
+    def __getitem__(self, i):
+        row = self._changed.get(i, self)
+        if row is self:
+            row = self._targets[self._offsets[i]:self._offsets[i + 1]]
+        return row
+
+    def __setitem__(self, i, row) -> None:
+        self._changed[i] = row
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self):
+        return (self[i] for i in range(self._length))
+
+    def append(self, row) -> None:
+        self._changed[self._length] = row
+        self._length += 1
+
+    def copy(self):
+        rows = _MappedRows(self._offsets, self._targets, self._length)
+        rows._changed = dict(self._changed)
+        return rows
+
+
+class _MappedNames(_MappedRows):
+    """
+    The vertex names of a graph loaded with mmap=True, each one decoded from the mapped name blob when it's asked for.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, i):
+        name = self._changed.get(i, self)
+        if name is self:
+            name = bytes(self._targets[self._offsets[i]:self._offsets[i + 1]]).decode()
+        return name
+
+    def encoded(self, i: int) -> bytes:
+        return bytes(self._targets[self._offsets[i]:self._offsets[i + 1]])
+
+    def copy(self):
+        names = _MappedNames(self._offsets, self._targets, self._length)
+        names._changed = dict(self._changed)
+        return names
+
+
+class _MappedIds:
+    """
+    Name -> id lookups for a graph loaded with mmap=True. Names from the file get binary searched in the file's list of
+        ids sorted by name, so there is no dict of every vertex to build. Vertices added or removed since loading are
+        kept in _changed (None for a removed one).
+    """
+    __slots__ = ('_names', '_by_name', '_count', '_changed')
+
+    def __init__(self, names: _MappedNames, by_name, count: int):
+        self._names = names
+        self._by_name = by_name
+        self._count = count
+        self._changed = {}
+
+    def _search(self, v):
+        # UTF-8 bytes sort in the same order as the strings, which is the order save() wrote the ids in
+        if not isinstance(v, str):
+            return None
+        try:
+            key = v.encode()
+        except UnicodeEncodeError:
+            return None
+        names, by_name = self._names, self._by_name
+        low, high = 0, len(by_name)
+        while low < high:
+            middle = (low + high) >> 1
+            if names.encoded(by_name[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(by_name) and names.encoded(by_name[low]) == key:
+            return by_name[low]
+        return None
+
+    def get(self, v, default=None):
+        i = self._changed[v] if v in self._changed else self._search(v)
+        return default if i is None else i
+
+    def __contains__(self, v) -> bool:
+        return self.get(v) is not None
+
+    def __setitem__(self, v, i: int) -> None:
+        if self.get(v) is None:
+            self._count += 1
+        self._changed[v] = i
+
+    def pop(self, v) -> int:
+        i = self.get(v)
+        if i is None:
+            raise KeyError(v)
+        self._changed[v] = None
+        self._count -= 1
+        return i
+
+    def __len__(self) -> int:
+        return self._count
+
+    def sorted_ids(self):
+        """
+        The ids of all the vertices in alphabetical order, straight from the file, or None once vertices have been
+            added or removed.
+        """
+        return None if self._changed else self._by_name
+
+    def copy(self):
+        ids = _MappedIds(self._names, self._by_name, self._count)
+        ids._changed = dict(self._changed)
+        return ids
+
+
+# Binary file layout used by save()/load(), everything little-endian:
+#   header: magic, format version, vertex count, adjacency entry count (2 per edge), name blob size, 32 bytes in all
+#   then int64 name_offsets[V + 1] and the UTF-8 name blob (padded to 8 bytes), so vertex i is
+#   blob[name_offsets[i]:name_offsets[i + 1]]
+#   then the adjacency as CSR: int64 offsets[V + 1] and int64 targets[entries], each row sorted by vertex id
+#   then (since version 2) int64 order[entries], the same rows again in the order their edges were added
+#   then (since version 3) int64 by_name[V], the vertex ids sorted by their UTF-8 names, so load() can look names up
+#   without building a dict
+FILE_MAGIC = b'UGRF'
+FILE_VERSION = 3
+_HEADER = struct.Struct('<4sIqqq')
+
+
+def _int64_array(data) -> array:
+    """
+    Copies int64 values out of a little-endian buffer into an array in our own byte order.
+    """
+    data = array('q', bytes(data))
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data
+
+
 class UndirectedGraph:
     """
     Class to implement undirected graph
@@ -44,15 +504,156 @@ class UndirectedGraph:
     MY CODE STARTS HERE!
     """
 
+    # Methods instrument() wraps, and the GraphMetrics they report to while it's on
+    instrumented_operations = ('dfs', 'bfs', 'has_cycle', 'count_connected_components', 'component_of',
+                               'same_component', 'shortest_path', 'distance')
+    metrics = None
+
+    # _read_only is set on snapshots. _shared means a snapshot still uses our lists, and _owned is the set of rows we
+    #   copied since the last snapshot (None if nothing is shared).
+    _read_only = False
+    _shared = False
+    _owned = None
+
+    @property
+    def adj_list(self) -> _AdjacencyView:
+        """
+        Read-only view mapping each vertex to the vertices it shares an edge with.
+
+        Internally every vertex name gets interned to a dense integer id. _names maps ids back to names, _ids maps
+            names to ids, and _rows[id] is the sorted array of neighbor ids (None once the vertex is removed). Names
+            only get looked up at the edges of the API, everything inside works on the integers. _order[id] holds the
+            same ids in the order their edges were added, which is the order the neighbors get printed in.
+
+        A row that gets edited once it has HOT_ROW_SIZE neighbors turns into a dict of neighbor ids in insertion order,
+            and then _rows[id] and _order[id] are that same dict. Only the busiest vertices pay for the hashing.
+        """
+        return _AdjacencyView(self)
+
+    @adj_list.setter
+    def adj_list(self, adj_list: dict) -> None:
+        # Assigning a new adjacency dict (like __init__ does) resets the graph to it
+        self._names = []
+        self._ids = {}
+        self._rows = []
+        self._order = []
+        self._rank = None
+        self._edge_count = 0
+        self._edge_index = None
+        self._components = ComponentIndex()
+        for v in adj_list:
+            self.add_vertex(v)
+        self.add_edges_from((u, v) for u in adj_list for v in adj_list[u])
+
+    def _intern(self, v) -> int:
+        """
+        Returns the id of vertex v, adding it to the graph if needed.
+        """
+        i = self._ids.get(v)
+        if i is None:
+            self._before_write()
+            components = self._component_index()
+            i = self._ids[v] = len(self._names)
+            self._names.append(v)
+            self._rows.append(array('i'))
+            self._order.append(array('i'))
+            self._rank = None
+            components.add_vertex(i)
+            if self._owned is not None:
+                self._owned.add(i)
+        return i
+
+    def _before_write(self) -> None:
+        """
+        Called before anything gets changed. Snapshots refuse, and if a snapshot still shares our lists they get copied
+            first. Rows only get copied once they are written to, by _writable_row().
+        """
+        if self._read_only:
+            raise TypeError('graph snapshots are read-only')
+        self._edge_index = None
+        if self._shared:
+            self._names = self._names.copy()
+            self._ids = self._ids.copy()
+            self._rows = self._rows.copy()
+            self._order = self._order.copy()
+            self._owned = set()
+            self._shared = False
+
+    def _writable_row(self, i: int) -> array:
+        """
+        Returns row i as an array we can change in place. Rows mapped from a file by load() are read-only and rows a
+            snapshot might still be using are off limits, so those get copied the first time, along with their
+            _order row.
+        """
+        self._before_write()
+        row = self._rows[i]
+        if type(row) is not array or (self._owned is not None and i not in self._owned):
+            row = self._rows[i] = array('i', row)
+            self._order[i] = array('i', self._order[i])
+            if self._owned is not None:
+                self._owned.add(i)
+        return row
+
+    def _ranks(self) -> array:
+        """
+        rank[id] is where the vertex's name falls in alphabetical order. Worked out once per batch of new vertices, so
+            the traversals can sort neighbors with integer compares instead of string compares.
+        """
+        if self._rank is None:
+            rows, names = self._rows, self._names
+            rank = array('i', bytes(4 * len(rows)))
+
+            # A mapped graph nobody has added or removed vertices on has them sorted already, in the file
+            alive = self._ids.sorted_ids() if type(self._ids) is _MappedIds else None
+            if alive is None:
+                alive = sorted((i for i in range(len(rows)) if rows[i] is not None), key=names.__getitem__)
+            for position, i in enumerate(alive):
+                rank[i] = position
+            self._rank = rank
+        return self._rank
+
+    def _hot_row(self, i: int) -> dict:
+        """
+        Returns row i as a dict we can change in place, turning it into one if it's still an array (or copying it if a
+            snapshot might still be using it).
+        """
+        self._before_write()
+        row = self._rows[i]
+        if type(row) is not dict or (self._owned is not None and i not in self._owned):
+            row = self._rows[i] = self._order[i] = dict.fromkeys(self._order[i])
+            if self._owned is not None:
+                self._owned.add(i)
+        return row
+
+    def _link(self, i: int, j: int) -> bool:
+        """
+        Puts j into row i, keeping the row sorted, and at the end of _order[i]. Returns False if it was already there.
+        """
+        row = self._rows[i]
+        if _has(row, j):
+            return False
+        if type(row) is dict or len(row) >= HOT_ROW_SIZE:
+            self._hot_row(i)[j] = None
+        else:
+            self._writable_row(i).insert(bisect_left(row, j), j)
+            self._order[i].append(j)
+        return True
+
+    def _unlink(self, i: int, j: int) -> None:
+        row = self._rows[i]
+        if type(row) is dict or len(row) >= HOT_ROW_SIZE:
+            del self._hot_row(i)[j]
+        else:
+            row = self._writable_row(i)
+            del row[bisect_left(row, j)]
+            self._order[i].remove(j)
+
     def add_vertex(self, v: str) -> None:
         """
         Add new vertex to the graph. Does nothing if the vertex already exists.
         """
-        if v in self.adj_list:
-            return
+        self._intern(v)
 
-        self.adj_list[v] = []
-        
     def add_edge(self, u: str, v: str) -> None:
         """
         Adds an edge between two vertices in the graph.
@@ -63,17 +664,66 @@ class UndirectedGraph:
             return
 
         # If the vertices don't yet exist, we add them to the graph
-        if u not in self.adj_list:
-            self.add_vertex(u)
-        if v not in self.adj_list:
-            self.add_vertex(v)
+        i, j = self._intern(u), self._intern(v)
 
         # If this edge already exists, does nothing
-        if u in self.adj_list[v]:
+        if not self._link(i, j):
             return
+        self._link(j, i)
+        self._edge_count += 1
+        self._component_index().union(i, j)
 
-        self.adj_list[u].append(v)
-        self.adj_list[v].append(u)
+    def add_edges_from(self, edges) -> None:
+        """
+        Adds many edges at once from an iterable of (u, v) pairs. Ends up exactly like calling add_edge() on each pair,
+            but each touched row only gets rebuilt once per batch.
+        """
+
+        # Grouping the new neighbors of every vertex first. Interning as we go gives the vertices the same ids
+        #   add_edge() would have given them, and the dicts keep the neighbors in the order add_edge() would add them.
+        intern = self._intern
+        new_neighbors = {}
+        for u, v in edges:
+            if u == v:
+                continue
+            i, j = intern(u), intern(v)
+            new_neighbors.setdefault(i, {})[j] = None
+            new_neighbors.setdefault(j, {})[i] = None
+
+        # Merging each row with its new neighbors in one go, then joining the components of the edges that are new
+        self._before_write()
+        rows, order = self._rows, self._order
+        components = self._component_index()
+        new_entries = 0
+        for i, neighbors in new_neighbors.items():
+            row = rows[i]
+            added = [j for j in neighbors if not _has(row, j)]
+            if added:
+                new_entries += len(added)
+                if type(row) is dict:
+                    self._hot_row(i).update(dict.fromkeys(added))
+                else:
+                    rows[i] = array('i', sorted(chain(row, added)))
+                    order[i] = array('i', order[i])
+                    order[i].extend(added)
+                    if self._owned is not None:
+                        self._owned.add(i)
+                for j in added:
+                    components.union(i, j)
+
+        # Every new edge went into two rows
+        self._edge_count += new_entries // 2
+
+    @classmethod
+    def from_edge_array(cls, u, v):
+        """
+        Builds a new graph from two parallel sequences (or NumPy arrays) of vertex names.
+        """
+        graph = cls()
+        u = u.tolist() if hasattr(u, 'tolist') else u
+        v = v.tolist() if hasattr(v, 'tolist') else v
+        graph.add_edges_from(zip(u, v))
+        return graph
 
     def remove_edge(self, v: str, u: str) -> None:
         """
@@ -81,17 +731,20 @@ class UndirectedGraph:
         """
 
         # If either vertex does not exist, does nothing
-        if u not in self.adj_list:
-            return
-        if v not in self.adj_list:
+        i, j = self._ids.get(v), self._ids.get(u)
+        if i is None or j is None:
             return
 
         # If the edge does not exist, does nothing
-        if u not in self.adj_list[v]:
+        if not _has(self._rows[i], j):
             return
 
-        self.adj_list[u].remove(v)
-        self.adj_list[v].remove(u)
+        self._unlink(i, j)
+        self._unlink(j, i)
+        self._edge_count -= 1
+
+        # The edge might have been the only thing holding its component together
+        self._component_index().mark_dirty(i)
 
     def remove_vertex(self, v: str) -> None:
         """
@@ -99,105 +752,294 @@ class UndirectedGraph:
         """
 
         # If vertex doesn't exist, does nothing
-        if v not in self.adj_list:
+        if v not in self._ids:
             return
-
-        # Goes through every vertex and removes every connection to the soon-to-be-removed vertex
-        for key in self.adj_list:
-            if v in self.adj_list[key]:
-                self.adj_list[key].remove(v)
-
-        # Removing the vertex
-        del self.adj_list[v]
+        self._before_write()
+        i = self._ids.pop(v)
+
+        # Edges go both ways, so only the neighbors of v have a connection to the soon-to-be-removed vertex
+        for j in self._rows[i]:
+            self._unlink(j, i)
+        self._edge_count -= len(self._rows[i])
+
+        # Removing the vertex. Its id isn't handed out again (so the other vertices keep their order) until there are
+        #   enough dead ids to be worth renumbering everything.
+        self._component_index().mark_dirty(i)
+        self._rows[i] = None
+        self._order[i] = None
+        self._names[i] = None
+        if len(self._rows) - len(self._ids) > max(1024, len(self._ids)):
+            self._renumber()
+
+    def _renumber(self) -> None:
+        """
+        Gives the vertices that are left ids 0..V-1 again, keeping their order.
+        """
+        rows, order = self._rows, self._order
+        alive = [i for i in range(len(rows)) if rows[i] is not None]
+
+        # The new ids keep the same order as the old ones, so every row is still sorted after mapping it
+        new_id = array('i', bytes(4 * len(rows)))
+        for position, i in enumerate(alive):
+            new_id[i] = position
+        self._rows, self._order = [], []
+        for i in alive:
+            if type(rows[i]) is dict:
+                row = dict.fromkeys(new_id[j] for j in rows[i])
+                self._rows.append(row)
+                self._order.append(row)
+            else:
+                self._rows.append(array('i', [new_id[j] for j in rows[i]]))
+                self._order.append(array('i', [new_id[j] for j in order[i]]))
+        self._names = [self._names[i] for i in alive]
+        self._ids = {name: i for i, name in enumerate(self._names)}
+        self._rank = None
+        self._owned = None
+        self._components = ComponentIndex.unknown(len(alive))
+
+    def save(self, path) -> None:
+        """
+        Writes the graph to a binary file (header, vertex name table, CSR adjacency) that load() can map straight back
+            into memory. Vertex names have to be strings.
+        """
+        names = self.get_vertices()
+        for name in names:
+            if not isinstance(name, str):
+                raise TypeError(f'save() only supports string vertex names, got {name!r}')
+
+        # Name table: one UTF-8 blob plus where each name starts
+        encoded = [name.encode() for name in names]
+        name_offsets = array('q', [0])
+        for name in encoded:
+            name_offsets.append(name_offsets[-1] + len(name))
+        blob = b''.join(encoded)
+        blob += bytes(-len(blob) % 8)
+
+        # The ids sorted by name, which load() binary searches instead of building a name -> id dict
+        by_name = array('q', sorted(range(len(encoded)), key=encoded.__getitem__))
+
+        # Array rows are already sorted neighbor ids (dict rows get sorted), they only need removed vertices squeezed
+        #   out of the numbering
+        rows = self._rows
+        new_id = array('q', bytes(8 * len(rows)))
+        position = 0
+        for i in range(len(rows)):
+            if rows[i] is not None:
+                new_id[i] = position
+                position += 1
+        offsets = array('q', [0])
+        targets = array('q')
+        order = array('q')
+        for i in range(len(rows)):
+            if rows[i] is not None:
+                targets.extend(new_id[j] for j in _sorted_row(rows[i]))
+                order.extend(new_id[j] for j in self._order[i])
+                offsets.append(len(targets))
+
+        # Written beside path and swapped in, since this graph or others might still have the old file mapped, and
+        #   truncating it under them would kill the process the next time they read a row
+        temp_path = f'{os.fspath(path)}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'wb') as file:
+                file.write(_HEADER.pack(FILE_MAGIC, FILE_VERSION, len(names), len(targets), len(blob)))
+                for data in (name_offsets, blob, offsets, targets, order, by_name):
+                    if isinstance(data, array) and sys.byteorder != 'little':
+                        data.byteswap()
+                    file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, mmap: bool = True):
+        """
+        Reads a graph written by save(). With mmap=True nothing gets parsed up front: rows are sliced out of the
+            memory-mapped file and names decoded the first time they're needed, and rows only get copied into memory
+            when they get edited. So processes loading the same file share one copy of it from the page cache.
+        """
+        mapped = mmap and sys.byteorder == 'little'
+        with open(path, 'rb') as file:
+            if mapped:
+                data = mmap_module.mmap(file.fileno(), 0, access=mmap_module.ACCESS_READ)
+            else:
+                data = file.read()
+
+        magic, version, v_count, entries, blob_size = _HEADER.unpack_from(data)
+        if magic != FILE_MAGIC:
+            raise ValueError(f'{path} is not an UndirectedGraph file')
+        if version not in (1, 2, FILE_VERSION):
+            raise ValueError(f'unsupported UndirectedGraph file version {version}')
+
+        # Carving the file up into its sections. Mapped sections stay views of the file, the others get copied out.
+        view = memoryview(data)
+        int64 = (lambda data: data.cast('q')) if mapped else _int64_array
+        start = _HEADER.size
+        name_offsets = int64(view[start:start + (v_count + 1) * 8])
+        start += (v_count + 1) * 8
+        blob = view[start:start + blob_size]
+        start += blob_size
+        offsets = int64(view[start:start + (v_count + 1) * 8])
+        start += (v_count + 1) * 8
+        targets = int64(view[start:start + entries * 8])
+        start += entries * 8
+
+        # Version 1 files have no insertion order, the neighbors just keep their sorted order. Versions before 3 have
+        #   no name index either, so their names go into a dict like an unmapped load.
+        order = targets
+        if version > 1:
+            order = int64(view[start:start + entries * 8])
+            start += entries * 8
+        by_name = int64(view[start:start + v_count * 8]) if version > 2 else None
+
+        # File ids are the same as our ids, so mapped rows can be used as they are
+        graph = cls()
+        graph._edge_count = entries // 2
+        if mapped:
+            graph._names = _MappedNames(name_offsets, blob, v_count)
+            graph._rows = _MappedRows(offsets, targets, v_count)
+            graph._order = _MappedRows(offsets, order, v_count)
+            if by_name is not None:
+                graph._ids = _MappedIds(graph._names, by_name, v_count)
+            else:
+                graph._ids = {graph._names[i]: i for i in range(v_count)}
+        else:
+            blob = bytes(blob)
+            graph._names = [blob[name_offsets[i]:name_offsets[i + 1]].decode() for i in range(v_count)]
+            graph._ids = {name: i for i, name in enumerate(graph._names)}
+            graph._rows = [array('i', targets[offsets[i]:offsets[i + 1]]) for i in range(v_count)]
+            graph._order = [array('i', order[offsets[i]:offsets[i + 1]]) for i in range(v_count)]
+
+        # Components get worked out the first time someone asks, not while loading
+        graph._components = None
+        return graph
 
     def get_vertices(self) -> []:
         """
         Return list of vertices in the graph (any order)
         """
-        v_list = []
-
-        for key in self.adj_list:
-            v_list.append(key)
-
-        return v_list
+        names, rows = self._names, self._rows
+        return [names[i] for i in range(len(rows)) if rows[i] is not None]
 
     def get_edges(self) -> []:
         """
         Return list of edges in the graph (any order)
         """
         e_list = []
-        # Going through the whole graph and adding all edges to the list
-        for key in self.adj_list:
-            for el in self.adj_list[key]:
-                if (el, key) not in e_list:
-                    e_list.append((key, el))
-        
+        names, rows = self._names, self._rows
+
+        # Every edge is listed once, from its vertex with the smaller id. In a sorted array row the neighbors with
+        #   bigger ids are the tail of the row.
+        for i in range(len(rows)):
+            row = rows[i]
+            if row is not None:
+                name = names[i]
+                e_list.extend((name, names[j]) for j in _above(row, i))
+
         return e_list
 
+    def vertices(self) -> _VerticesView:
+        """
+        Returns a live, set-like view of the vertices. Unlike get_vertices() nothing gets copied, and it keeps up with
+            later changes to the graph.
+        """
+        return _VerticesView(self)
+
+    def edges(self) -> _EdgesView:
+        """
+        Returns a live, set-like view of the edges as (u, v) pairs, with an O(1) len(). Iterating it streams the edges
+            in the same order get_edges() lists them.
+        """
+        return _EdgesView(self)
+
+    def neighbors(self, v) -> _NeighborView:
+        """
+        Returns a live view of the neighbors of v, with an O(1) len(). Empty if v isn't in the graph.
+        """
+        return _NeighborView(self, v)
+
     def is_valid_path(self, path: []) -> bool:
         """
         Return true if provided path is valid, False otherwise
         """
-        counter = 1
+        ids, rows = self._ids, self._rows
+        previous = None
         for vertex in path:
 
             # If any vertex doesn't exist, obviously not a valid path
-            if vertex not in self.adj_list:
+            i = ids.get(vertex)
+            if i is None:
                 return False
 
-            # If we have reached the lat node, it is a valid path
-            if counter == len(path):
-                return True
-
             # If we can't move from one node to the next, it is not a valid path
-            if path[counter] not in self.adj_list[vertex]:
+            if previous is not None and not _has(rows[previous], i):
                 return False
-
-            counter += 1
+            previous = i
 
         return True
 
+    def validate_paths(self, paths, offsets=None) -> ():
+        """
+        Checks many paths at once, with the same answers as is_valid_path(). paths is a list of vertex lists, or one
+            flat sequence of names with path k at offsets[k]:offsets[k + 1]. Returns (valid, first_invalid), where
+            first_invalid[k] is the position in path k of the first vertex that isn't in the graph or isn't next to the
+            one before it (-1 for a valid path). Both are NumPy arrays, or lists without NumPy.
+        """
+        flat, offsets = split_paths(paths, offsets)
+        ids, rows = self._ids, self._rows
+        if np is None:
+            return check_paths_python(flat, offsets, ids.__contains__, lambda u, v: _has(rows[ids[u]], ids[v]))
+
+        # Names only get looked up once each, then the hops get checked on the ids. Array rows are already sorted, dict
+        #   rows get sorted, and they all get packed into CSR arrays the first time after every change.
+        vertex_ids = np.fromiter((ids.get(v, -1) for v in flat), dtype=np.int64, count=len(flat))
+        if self._edge_index is None:
+            offsets_csr = [0]
+            for row in rows:
+                offsets_csr.append(offsets_csr[-1] + (len(row) if row is not None else 0))
+            targets = [np.asarray(_sorted_row(row), dtype=np.int64) for row in rows if row]
+            self._edge_index = csr_index(offsets_csr, np.concatenate(targets) if targets else [])
+        return check_paths(vertex_ids, offsets, vertex_ids >= 0, self._edge_index)
+
     def dfs(self, v_start, v_end=None) -> []:
         """
         Return list of vertices visited during DFS search
         Vertices are picked in alphabetical order
         """
 
-        dfs_list = []
-        dfs_stack = [v_start]
-
-        # sort_list just gets added to the stack, it's  just here to get sorted for the alphabetical order
-        sort_list = []
-
         # If start vertex isn't on the graph, return an empty list
-        if v_start not in self.adj_list:
+        start = self._ids.get(v_start)
+        if start is None:
             return []
+        end = self._ids.get(v_end, -1)
+
+        rows, rank = self._rows, self._ranks()
+        dfs_list = []
+        dfs_stack = [start]
+        visited = bytearray(len(rows))
 
         while len(dfs_stack) > 0:
             # Removing from the end of the list (top of the stack for us)
-            cur = dfs_stack.pop(len(dfs_stack) - 1)
-
-            # Adding the vertex if it hasn't been added, and checking if we've reached our end-point
-            if cur not in dfs_list:
-                dfs_list.append(cur)
-                if cur == v_end:
-                    return dfs_list
-
-            # Filling up the list to be sorted
-            for vertex in self.adj_list[cur]:
-                if vertex not in dfs_list:
-                    sort_list.append(vertex)
-
-            # Sorting the list then reversing it. I can probably do this with one function can't I?
-            sort_list.sort()
-            sort_list.reverse()
-
-            # Adding sorted values to the stack
-            for vertex in sort_list:
-                dfs_stack.append(vertex)
-            sort_list.clear()
-
-        return dfs_list
+            cur = dfs_stack.pop()
+
+            # A vertex can be on the stack more than once. By the time a second copy comes up, everything the first
+            #   copy pushed has been visited, so there is nothing left to do for it.
+            if visited[cur]:
+                continue
+            visited[cur] = 1
+            dfs_list.append(cur)
+            if cur == end:
+                break
+
+            # Adding the unvisited neighbors to the stack in reverse alphabetical order, so the first one in the
+            #   alphabet ends up on top
+            for vertex in sorted(rows[cur], key=rank.__getitem__, reverse=True):
+                if not visited[vertex]:
+                    dfs_stack.append(vertex)
+
+        names = self._names
+        return [names[i] for i in dfs_list]
 
     def bfs(self, v_start, v_end=None) -> []:
         """
@@ -205,102 +1047,230 @@ class UndirectedGraph:
         Vertices are picked in alphabetical order
         """
 
-        bfs_list = []
-        bfs_queue = [v_start]
-
-        # Same function as dfs sorted list
-        sort_list = []
-
         # If start vertex isn't on the graph, return an empty list
-        if v_start not in self.adj_list:
+        start = self._ids.get(v_start)
+        if start is None:
             return []
+        end = self._ids.get(v_end, -1)
+
+        rows, rank = self._rows, self._ranks()
+        bfs_list = []
+        bfs_queue = deque([start])
+        visited = bytearray(len(rows))
 
         while len(bfs_queue) > 0:
             # Since we append from the end of the queue, we remove from the start
-            cur = bfs_queue.pop(0)
+            cur = bfs_queue.popleft()
 
             # Adding the vertex if it hasn't been added, and checking if we've reached our end-point
-            if cur not in bfs_list:
+            if not visited[cur]:
+                visited[cur] = 1
                 bfs_list.append(cur)
-                if cur == v_end:
-                    return bfs_list
+                if cur == end:
+                    break
 
-                # Adding values to the sort list, then sorting them, then adding them to the queue
-                for vertex in self.adj_list[cur]:
-                    sort_list.append(vertex)
-                sort_list.sort()
-                for vertex in sort_list:
-                    bfs_queue.append(vertex)
-                sort_list.clear()
+                # Adding the neighbors to the queue in alphabetical order
+                for vertex in sorted(rows[cur], key=rank.__getitem__):
+                    if not visited[vertex]:
+                        bfs_queue.append(vertex)
 
-        return bfs_list
+        names = self._names
+        return [names[i] for i in bfs_list]
 
     def count_connected_components(self):
         """
         Return number of connected components in the graph
         """
-        vertex_list = []
-        result = 0
 
-        # Creating a modifiable copy of self.adj_list
-        for vertex in self.adj_list:
-            vertex_list.append(vertex)
+        # The union-find index is kept up to date by the edit methods, so this only has to rebuild components that
+        #   might have been split since last time
+        components = self._component_index()
+        components.flush(self._rows)
+        return components.count
 
-        while len(vertex_list) > 0:
-            for vertex in vertex_list:
+    def component_of(self, v):
+        """
+        Returns a representative vertex for the connected component of v (the same one for every vertex in that
+            component), or None if v isn't in the graph.
+        """
+        i = self._ids.get(v)
+        if i is None:
+            return None
+        components = self._component_index()
+        components.flush(self._rows)
+        return self._names[components.find(i)]
+
+    def same_component(self, u, v) -> bool:
+        """
+        Returns True if there is a path between u and v, False otherwise.
+        """
+        i, j = self._ids.get(u), self._ids.get(v)
+        if i is None or j is None:
+            return False
+        components = self._component_index()
+        components.flush(self._rows)
+        return components.find(i) == components.find(j)
+
+    def _component_index(self) -> ComponentIndex:
+        # Snapshots and loaded graphs start without one, and work their components out the first time they're asked
+        if self._components is None:
+            self._components = ComponentIndex.unknown(len(self._rows))
+        return self._components
+
+    def snapshot(self):
+        """
+        Returns a read-only copy of the graph as it is right now, in O(1). The two share their vertex table and
+            adjacency rows, and whichever rows this graph writes to afterwards get copied first, so the snapshot never
+            changes and readers of it never hold up writers of this one. Every read method works on a snapshot, and
+            writing to one raises TypeError.
+        """
+        # Skipping __init__, which would reset everything
+        frozen = object.__new__(type(self))
+        frozen._names, frozen._ids, frozen._rows, frozen._rank = self._names, self._ids, self._rows, self._rank
+        frozen._order = self._order
+        frozen._edge_count = self._edge_count
+        frozen._edge_index = self._edge_index
+        frozen._components = None
+        frozen._read_only = True
+        self._shared = True
+        return frozen
+
+    def shortest_path(self, u, v, max_depth: int = None) -> []:
+        """
+        Returns the vertices on a shortest path from u to v (both included), or an empty list if there is no path, or
+            none with at most max_depth edges.
+        """
+        i, j = self._ids.get(u), self._ids.get(v)
+        if i is None or j is None:
+            return []
+        path = self._bidirectional_bfs(i, j, max_depth)
+        if path is None:
+            return []
+        names = self._names
+        return [names[vertex] for vertex in path]
 
-                # Creating a new list with all connected vertices using bfs, then removing those from our list of total
-                #   number of vertices. The number of times we have to do this is the number of connected components.
-                new_list = self.bfs(vertex)
-                for el in new_list:
-                    if el in vertex_list:
-                        vertex_list.remove(el)
-                if vertex in vertex_list:
-                    vertex_list.remove(vertex)
-                result += 1
+    def distance(self, u, v, max_depth: int = None):
+        """
+        Returns the number of edges on a shortest path from u to v, or float('inf') if there is no path, or none with
+            at most max_depth edges.
+        """
+        i, j = self._ids.get(u), self._ids.get(v)
+        if i is None or j is None:
+            return float('inf')
+        path = self._bidirectional_bfs(i, j, max_depth)
+        return float('inf') if path is None else len(path) - 1
 
-        return result
+    def _bidirectional_bfs(self, start: int, goal: int, max_depth):
+        """
+        Breadth-first search from both ends at once, one whole level at a time, always growing whichever side has the
+            smaller frontier. Returns the ids on a shortest path, or None. Only the vertices the two searches reach get
+            touched, which on a small-world graph is a tiny part of it.
+        """
+        if start == goal:
+            return [start]
+
+        # Index 0 is the search from start, index 1 the one from goal. parents[side][v] is the vertex v was reached
+        #   from, and depths[side][v] how many edges away from that side's end it is.
+        rows = self._rows
+        parents = ({start: -1}, {goal: -1})
+        depths = ({start: 0}, {goal: 0})
+        frontiers = [[start], [goal]]
+        levels = [0, 0]
+
+        while frontiers[0] and frontiers[1]:
+            # Every path we could still find has more edges than the two searches have covered between them
+            if max_depth is not None and levels[0] + levels[1] >= max_depth:
+                return None
+
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            parent, depth = parents[side], depths[side]
+            other_depth = depths[1 - side]
+            levels[side] += 1
+            level = levels[side]
+
+            # The whole level gets expanded before picking where the searches meet, since the first meeting vertex
+            #   found isn't always on the shortest path
+            frontier = []
+            best, meet = None, None
+            for vertex in frontiers[side]:
+                for el in rows[vertex]:
+                    if el in parent:
+                        continue
+                    parent[el] = vertex
+                    depth[el] = level
+                    frontier.append(el)
+                    if el in other_depth and (best is None or level + other_depth[el] < best):
+                        best, meet = level + other_depth[el], el
+            frontiers[side] = frontier
+
+            if meet is not None:
+                if max_depth is not None and best > max_depth:
+                    return None
+
+                # Walking back from the meeting vertex to start, then forwards from it to goal
+                path = [meet]
+                while path[-1] != start:
+                    path.append(parents[0][path[-1]])
+                path.reverse()
+                while path[-1] != goal:
+                    path.append(parents[1][path[-1]])
+                return path
+
+        return None
+
+    def instrument(self, metrics: GraphMetrics = None) -> GraphMetrics:
+        """
+        Starts counting vertices visited, edges scanned and time for every call to the methods in
+            instrumented_operations. Returns the GraphMetrics they go into (a new one unless metrics is given).
+        """
+        return instrument(self, self.instrumented_operations, metrics)
 
-    def has_cycle(self):
+    def uninstrument(self) -> None:
+        uninstrument(self, self.instrumented_operations)
+
+    def _start_counting(self, probe):
         """
-        Return True if graph contains a cycle, False otherwise
+        Points the adjacency rows at probe for one instrumented call, and returns the function that undoes it.
         """
+        rows = self._rows
+        self._rows = _CountingRows(rows, probe)
 
-        vertex_list = []
-        new_list = []
-        banned_list = []
+        def restore():
+            self._rows = rows
 
-        # Creating a copy of self.adj_list
-        for vertex in self.adj_list:
-            vertex_list.append(vertex)
+        return restore
 
-        # We go through and one by one remove all vertices that have 0 or one connection (since those can't help with a
-        #   loop). If we have an empty list, there is no loop. If there are still nodes remaining after all nodes with 1
-        #   or 0 connections have been removed, then they form a loop.
-        while len(vertex_list) > 0:
-
-            # new_list is used to check if we've gone through our whole list yet
-            if len(new_list) >= len(vertex_list):
-                return True
-
-            # banned_list is subtracted from the number of connects, because the banned list contains vertices removed
-            #   for not being part of a loop
-            for vertex in vertex_list:
-                score = len(self.adj_list[vertex])
-                for el in banned_list:
-                    if el in self.adj_list[vertex]:
-                        score -= 1
-
-                # Removing node if it is not part of the loop and clearing the new_list that checks for the loop
-                if score <= 1:
-                    vertex_list.remove(vertex)
-                    banned_list.append(vertex)
-                    new_list.clear()
-                # Adding another value to the new_list, whose length will be checked above if we have a loop
-                else:
-                    new_list.append(vertex)
+    def has_cycle(self):
+        """
+        Return True if graph contains a cycle, False otherwise
+        """
 
-        return False
+        # We go through and one by one remove all vertices that have 0 or one connection (since those can't help with a
+        #   loop), which can leave their neighbor with one connection too. If there are still vertices remaining after
+        #   all of those have been removed, then they form a loop.
+        rows = self._rows
+        degree = array('i', bytes(4 * len(rows)))
+        queue = []
+        alive = 0
+        for i in range(len(rows)):
+            if rows[i] is not None:
+                alive += 1
+                degree[i] = len(rows[i])
+                if degree[i] <= 1:
+                    queue.append(i)
+
+        removed = bytearray(len(rows))
+        while queue:
+            vertex = queue.pop()
+            removed[vertex] = 1
+            alive -= 1
+            for el in rows[vertex]:
+                if not removed[el]:
+                    degree[el] -= 1
+                    if degree[el] == 1:
+                        queue.append(el)
+
+        return alive > 0
 
     """
     MY CODE ENDS HERE!
@@ -391,3 +1361,80 @@ if __name__ == '__main__':
         u, v = edge
         g.add_edge(u, v) if command == 'add' else g.remove_edge(u, v)
         print('{:<10}'.format(case), g.has_cycle())
+
+    print("\nvertices() / edges() / neighbors() views")
+    print("----------------------------------------")
+    g = UndirectedGraph(['AB', 'AC', 'BC', 'CD'])
+    vertices, edges, neighbors = g.vertices(), g.edges(), g.neighbors('C')
+    print(len(vertices), len(edges), 'D' in vertices, ('B', 'A') in edges, list(neighbors), 'D' in neighbors)
+    print(sorted(vertices | {'Z'}), sorted(vertices - {'A'}), sorted(edges & {('A', 'B'), ('A', 'Z')}))
+    g.remove_vertex('D')
+    print(len(vertices), len(edges), list(neighbors))
+
+    print("\ncomponent_of() / same_component() example")
+    print("-----------------------------------------")
+    g = UndirectedGraph(['AB', 'BC', 'DE'])
+    g.add_vertex('F')
+    print(g.same_component('A', 'C'), g.same_component('A', 'D'), g.same_component('A', 'Z'), g.component_of('Z'))
+    print(g.component_of('A') == g.component_of('C'), g.component_of('F') == 'F')
+    g.remove_edge('B', 'C')
+    g.add_edge('C', 'D')
+    print(g.same_component('A', 'C'), g.same_component('C', 'E'), g.count_connected_components())
+
+    print("\nshortest_path() / distance() example")
+    print("------------------------------------")
+    g = UndirectedGraph(['AB', 'BC', 'CD', 'DE', 'AF', 'FE', 'GH'])
+    for u, v in ['AE', 'AD', 'EA', 'AA', 'AG', 'AZ']:
+        print(u, v, g.shortest_path(u, v), g.distance(u, v))
+    print(g.shortest_path('A', 'D', max_depth=2), g.distance('A', 'D', max_depth=3))
+
+    print("\nadd_edges_from() / from_edge_array() keep the add_edge() order")
+    print("--------------------------------------------------------------")
+    edges = ['AB', 'AC', 'BC', 'BD', 'CD', 'CE', 'DE', 'DH', 'EH', 'EB']
+    g = UndirectedGraph()
+    g.add_edges_from(edges)
+    print(g)
+    print(str(g) == str(UndirectedGraph(edges)),
+          str(g) == str(UndirectedGraph.from_edge_array([u for u, _ in edges], [v for _, v in edges])))
+
+    print("\nsnapshot() example")
+    print("------------------")
+    g = UndirectedGraph(['AB', 'BC'])
+    frozen = g.snapshot()
+    g.add_edge('C', 'A')
+    g.remove_vertex('B')
+    print(frozen, frozen.has_cycle(), g, g.has_cycle())
+    try:
+        frozen.add_edge('A', 'C')
+    except TypeError as error:
+        print(error)
+
+    print("\nsave() / load() example")
+    print("-----------------------")
+    import os
+    import tempfile
+    g = UndirectedGraph(['EB', 'AB', 'AC', 'BC', 'CD'])
+    g.remove_vertex('C')
+    path = os.path.join(tempfile.mkdtemp(), 'graph.ug')
+    g.save(path)
+    for mmap in (True, False):
+        loaded = UndirectedGraph.load(path, mmap)
+        loaded.add_edge('D', 'A')
+        print(g, loaded)
+        del loaded
+    os.remove(path)
+
+    print("\nvalidate_paths() example")
+    print("------------------------")
+    g = UndirectedGraph(['AB', 'AC', 'BC', 'BD', 'CD', 'CE', 'DE', 'DH', 'EH', 'EB'])
+    valid, first_invalid = g.validate_paths(['ABC', 'ADE', 'EDHEBC', '', 'Z', 'HZ'])
+    print([bool(x) for x in valid], [int(x) for x in first_invalid])
+
+    print("\ninstrument() example")
+    print("--------------------")
+    metrics = g.instrument()
+    g.bfs('A')
+    g.shortest_path('A', 'H')
+    g.count_connected_components()
+    print({name: stats['calls'] for name, stats in metrics.as_dict().items()})
+    g.uninstrument()